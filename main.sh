@@ -1,2 +1,4 @@
 python3 src/main.py
-cd public && python3 -m http.server 8888
+# Serving by path rather than from inside public/ keeps following the live
+# site after an --atomic rebuild swaps the directory
+python3 -m http.server 8888 --directory public
@@ -0,0 +1,229 @@
+import json
+import os
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Set, Tuple
+from urllib.parse import urlsplit
+
+from manifest import file_hash, text_hash
+from minify import AssetMinifier
+from sync import fast_copy
+
+ASSETS_VERSION = 1
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".gif", ".webp"}
+# Everything a page or template may reference that can be cached forever
+ASSET_SUFFIXES = IMAGE_SUFFIXES | {
+    ".css",
+    ".js",
+    ".svg",
+    ".ico",
+    ".woff",
+    ".woff2",
+    ".ttf",
+}
+# JPEG start of frame markers, the others in 0xC0-0xCF are not frames
+JPEG_FRAMES = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def jpeg_size(fp: BinaryIO) -> Tuple[int, int] | None:
+    # Walks the segment headers up to the first frame, skipping their bodies
+    fp.seek(2)
+    while True:
+        if fp.read(1) != b"\xff":
+            return None
+        marker = fp.read(1)
+        while marker == b"\xff":
+            marker = fp.read(1)
+        if not marker:
+            return None
+        if marker[0] == 0x01 or 0xD0 <= marker[0] <= 0xD8:
+            # Standalone markers have no length
+            continue
+        length = fp.read(2)
+        if len(length) < 2:
+            return None
+        if marker[0] in JPEG_FRAMES:
+            frame = fp.read(5)
+            if len(frame) < 5:
+                return None
+            return int.from_bytes(frame[3:5], "big"), int.from_bytes(frame[1:3], "big")
+        fp.seek(int.from_bytes(length, "big") - 2, os.SEEK_CUR)
+
+
+def image_size(path: Path) -> Tuple[int, int] | None:
+    with open(path, "rb") as fp:
+        header = fp.read(30)
+        if header.startswith(b"\x89PNG\r\n\x1a\n") and header[12:16] == b"IHDR":
+            return (
+                int.from_bytes(header[16:20], "big"),
+                int.from_bytes(header[20:24], "big"),
+            )
+        if header[:6] in (b"GIF87a", b"GIF89a"):
+            return (
+                int.from_bytes(header[6:8], "little"),
+                int.from_bytes(header[8:10], "little"),
+            )
+        if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+            chunk = header[12:16]
+            if chunk == b"VP8 ":
+                return (
+                    int.from_bytes(header[26:28], "little") & 0x3FFF,
+                    int.from_bytes(header[28:30], "little") & 0x3FFF,
+                )
+            if chunk == b"VP8L":
+                bits = int.from_bytes(header[21:25], "little")
+                return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+            if chunk == b"VP8X":
+                return (
+                    int.from_bytes(header[24:27], "little") + 1,
+                    int.from_bytes(header[27:30], "little") + 1,
+                )
+            return None
+        if header.startswith(b"\xff\xd8"):
+            return jpeg_size(fp)
+    return None
+
+
+def fingerprinted(path: Path, digest: str) -> Path:
+    return path.with_name(f"{path.stem}.{digest[:12]}{path.suffix}")
+
+
+class AssetMap:
+    def __init__(
+        self,
+        static: Path,
+        root: Path,
+        state_path: Path | None = None,
+        suffixes: Set[str] = ASSET_SUFFIXES,
+        minifier: AssetMinifier | None = None,
+    ) -> None:
+        self.static = static
+        self.root = root
+        self.state_path = state_path
+        self.suffixes = suffixes
+        self.minifier = minifier
+        # relative path -> [size, mtime_ns, hash], so unchanged files are not
+        # hashed again, and hash -> dimensions, so no image is read twice
+        self.files: Dict[str, List] = {}
+        self.sizes: Dict[str, List[int] | None] = {}
+        # url -> fingerprinted url, as of this build and of the previous one
+        self.urls: Dict[str, str] = {}
+        self.previous: Dict[str, str] = {}
+
+    def __getstate__(self) -> Dict:
+        # Worker processes only resolve urls, they never minify or copy
+        return {**self.__dict__, "minifier": None}
+
+    def load(self) -> None:
+        if self.state_path is None:
+            return
+        try:
+            with open(self.state_path) as state_file:
+                data = json.load(state_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        if data.get("version") != ASSETS_VERSION:
+            return
+        self.files = data["files"]
+        self.sizes = data["sizes"]
+        self.previous = data["urls"]
+
+    def save(self) -> None:
+        if self.state_path is None:
+            return
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.state_path, mode="w") as state_file:
+            json.dump(
+                {
+                    "version": ASSETS_VERSION,
+                    "files": self.files,
+                    "sizes": self.sizes,
+                    "urls": self.urls,
+                },
+                state_file,
+                indent=1,
+                sort_keys=True,
+            )
+
+    def content_hash(self, path: Path, key: str) -> str:
+        stat = path.stat()
+        known = self.files.get(key)
+        if known is not None and known[:2] == [stat.st_size, stat.st_mtime_ns]:
+            return known[2]
+        digest = file_hash(path)
+        self.files[key] = [stat.st_size, stat.st_mtime_ns, digest]
+        return digest
+
+    def build(self) -> List[Path]:
+        files = {}
+        copied = []
+        for path in sorted(self.static.rglob("*")):
+            if not path.is_file() or path.suffix.lower() not in self.suffixes:
+                continue
+            key = path.relative_to(self.static).as_posix()
+            digest = self.content_hash(path, key)
+            files[key] = self.files[key]
+            if path.suffix.lower() in IMAGE_SUFFIXES and digest not in self.sizes:
+                self.sizes[digest] = image_size(path)
+
+            source = path
+            if self.minifier is not None and self.minifier.handles(path):
+                # Named after the bytes that are served
+                source = self.minifier.cached(path, digest)
+                digest = file_hash(source)
+            dest = fingerprinted(self.root / key, digest)
+            self.urls["/" + key] = "/" + dest.relative_to(self.root).as_posix()
+            if not dest.exists():
+                # Content addressed, an existing copy already has these bytes.
+                # Never a hard link, an edit to the source must not reach it.
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                fast_copy(source, dest)
+                copied.append(dest)
+
+        self.files = files
+        used = {files[key][2] for key in files}
+        self.sizes = {
+            digest: size for digest, size in self.sizes.items() if digest in used
+        }
+        return copied
+
+    def remove_stale(self) -> List[Path]:
+        removed = []
+        current = set(self.urls.values())
+        for url in set(self.previous.values()) - current:
+            path = self.root / url.lstrip("/")
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                continue
+            removed.append(path)
+        return removed
+
+    def changed(self) -> Set[str]:
+        # Urls whose fingerprint differs from the previous build
+        return {
+            url
+            for url in self.urls.keys() | self.previous.keys()
+            if self.urls.get(url) != self.previous.get(url)
+        }
+
+    def outputs(self) -> List[Path]:
+        return [self.root / url.lstrip("/") for url in self.urls.values()]
+
+    def digest(self) -> str:
+        state = {url: [self.urls[url], self.size_of(url)] for url in self.urls}
+        return text_hash(json.dumps(state, sort_keys=True))
+
+    def size_of(self, url: str) -> List[int] | None:
+        known = self.files.get(url.lstrip("/"))
+        return self.sizes.get(known[2]) if known is not None else None
+
+    def image_props(self, url: str) -> Dict[str, str] | None:
+        path = urlsplit(url).path
+        if path not in self.urls:
+            return None
+        props = {"src": self.urls[path]}
+        size = self.size_of(path)
+        if size is not None:
+            props["width"], props["height"] = str(size[0]), str(size[1])
+        props["loading"] = "lazy"
+        return props
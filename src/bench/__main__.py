@@ -0,0 +1,78 @@
+import argparse
+import json
+import platform
+import sys
+from pathlib import Path
+from typing import Dict
+
+from bench.corpus import CorpusGenerator
+from bench.suite import BENCHMARKS, measure
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the build benchmarks")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "-k", "--filter", default="", help="only run benchmarks containing this"
+    )
+    parser.add_argument("--output", type=Path, help="write the results as json")
+    parser.add_argument("--baseline", type=Path, help="compare against saved json")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.10,
+        help="slowdown ratio against the baseline that counts as a regression",
+    )
+    return parser.parse_args(argv)
+
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    threshold: float,
+) -> Dict[str, Dict[str, float]]:
+    comparison = {}
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result["min"] / baseline[name]["min"]
+        comparison[name] = {"ratio": ratio, "regression": ratio > threshold}
+    return comparison
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if args.filter not in name:
+            continue
+        run = setup(CorpusGenerator(args.seed))
+        results[name] = measure(run, args.repeat)
+        print(f"{name:<24} min {results[name]['min'] * 1000:9.2f} ms", file=sys.stderr)
+
+    report = {
+        "python": platform.python_version(),
+        "seed": args.seed,
+        "benchmarks": results,
+    }
+    if args.baseline is not None:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)["benchmarks"]
+        report["comparison"] = compare(results, baseline, args.threshold)
+        for name, item in report["comparison"].items():
+            flag = "  REGRESSION" if item["regression"] else ""
+            print(f"{name:<24} x{item['ratio']:.2f}{flag}", file=sys.stderr)
+
+    output = json.dumps(report, indent=1)
+    if args.output is None:
+        print(output)
+    else:
+        args.output.write_text(output)
+
+    regressions = report.get("comparison", {}).values()
+    return 1 if any(item["regression"] for item in regressions) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
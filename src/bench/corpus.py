@@ -0,0 +1,115 @@
+import random
+from pathlib import Path
+from typing import List
+
+WORDS = (
+    "the road goes ever on and down from door where it began now far ahead has "
+    "gone must follow if can pursuing with eager feet until joins some larger way "
+    "many paths errands meet whither then cannot say elven ring mountain river "
+    "hobbit wizard shire council forest tower"
+).split()
+
+
+class CorpusGenerator:
+    def __init__(self, seed: int = 0) -> None:
+        self.random = random.Random(seed)
+
+    def words(self, count: int) -> str:
+        return " ".join(self.random.choice(WORDS) for _ in range(count))
+
+    def url(self) -> str:
+        return f"/{self.random.choice(WORDS)}/{self.random.randrange(10_000)}"
+
+    def inline(self, count: int) -> str:
+        # Plain words mixed with every inline element the parser knows
+        parts = []
+        for _ in range(count):
+            roll = self.random.random()
+            if roll < 0.05:
+                parts.append(f"**{self.words(2)}**")
+            elif roll < 0.10:
+                parts.append(f"*{self.words(2)}*")
+            elif roll < 0.13:
+                parts.append(f"_{self.words(1)}_")
+            elif roll < 0.16:
+                parts.append(f"`{self.words(1)}`")
+            elif roll < 0.19:
+                parts.append(f"[{self.words(2)}]({self.url()})")
+            elif roll < 0.20:
+                parts.append(f"![{self.words(2)}]({self.url()}.png)")
+            else:
+                parts.append(self.random.choice(WORDS))
+        return " ".join(parts)
+
+    def link_dense(self, links: int) -> str:
+        return " and ".join(f"[{self.words(2)}]({self.url()})" for _ in range(links))
+
+    def heading(self, level: int = 2) -> str:
+        return f"{'#' * level} {self.words(4)}"
+
+    def unordered_list(self, items: int) -> str:
+        return "\n".join(f"* {self.inline(8)}" for _ in range(items))
+
+    def ordered_list(self, items: int) -> str:
+        return "\n".join(f"{i + 1}. {self.inline(8)}" for i in range(items))
+
+    def quote(self, lines: int) -> str:
+        return "\n".join(f"> {self.words(10)}" for _ in range(lines))
+
+    def nested_list(self, depth: int, items: int = 2) -> str:
+        # Walks down to depth and back up again, mixing list kinds per level
+        lines = []
+        levels = list(range(depth)) + list(reversed(range(depth - 1)))
+        for level in levels:
+            for i in range(items):
+                marker = f"{i + 1}." if level % 2 else "*"
+                lines.append(f"{'  ' * level}{marker} {self.inline(6)}")
+        return "\n".join(lines)
+
+    def nested_quote(self, depth: int, lines: int = 2) -> str:
+        levels = list(range(1, depth + 1)) + list(reversed(range(1, depth)))
+        return "\n".join(
+            f"{'>' * level} {self.words(8)}" for level in levels for _ in range(lines)
+        )
+
+    def code_block(self, lines: int) -> str:
+        body = "\n".join(
+            f"    call({self.random.randrange(1000)})" for _ in range(lines)
+        )
+        return f"```\n{body}\n```"
+
+    def document(self, blocks: int) -> str:
+        parts = [self.heading(1)]
+        for _ in range(blocks):
+            roll = self.random.random()
+            if roll < 0.15:
+                parts.append(self.heading(self.random.randint(2, 6)))
+            elif roll < 0.30:
+                parts.append(self.unordered_list(self.random.randint(2, 10)))
+            elif roll < 0.40:
+                parts.append(self.ordered_list(self.random.randint(2, 10)))
+            elif roll < 0.50:
+                parts.append(self.quote(self.random.randint(1, 4)))
+            elif roll < 0.55:
+                parts.append(self.code_block(self.random.randint(3, 30)))
+            else:
+                parts.append(self.inline(self.random.randint(20, 80)))
+        return "\n\n".join(parts)
+
+    def write_tree(
+        self, root: Path, depth: int, fanout: int, pages: int, blocks: int = 20
+    ) -> List[Path]:
+        root.mkdir(parents=True, exist_ok=True)
+        written = []
+        for i in range(pages):
+            page = root / ("index.md" if i == 0 else f"page{i}.md")
+            page.write_text(self.document(blocks))
+            written.append(page)
+        if depth > 0:
+            for i in range(fanout):
+                written.extend(
+                    self.write_tree(
+                        root / f"section{i}", depth - 1, fanout, pages, blocks
+                    )
+                )
+        return written
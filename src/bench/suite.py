@@ -0,0 +1,109 @@
+import contextlib
+import io
+import itertools
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict
+
+from bench.corpus import CorpusGenerator
+from block import markdown_to_html_node
+from document import generate_pages_recursively
+from inline import text_to_text_nodes
+
+BENCHMARKS: Dict[str, Callable[[CorpusGenerator], Callable[[], object]]] = {}
+
+
+def benchmark(name: str):
+    def decorator(setup):
+        BENCHMARKS[name] = setup
+        return setup
+
+    return decorator
+
+
+@benchmark("inline/link_dense")
+def inline_link_dense(corpus: CorpusGenerator):
+    text = corpus.link_dense(2_000)
+    return lambda: text_to_text_nodes(text)
+
+
+@benchmark("inline/paragraph")
+def inline_paragraph(corpus: CorpusGenerator):
+    text = corpus.inline(5_000)
+    return lambda: text_to_text_nodes(text)
+
+
+@benchmark("block/document")
+def block_document(corpus: CorpusGenerator):
+    markdown = corpus.document(500)
+    return lambda: markdown_to_html_node(markdown)
+
+
+@benchmark("block/long_list")
+def block_long_list(corpus: CorpusGenerator):
+    markdown = corpus.unordered_list(5_000)
+    return lambda: markdown_to_html_node(markdown)
+
+
+@benchmark("block/deep_list")
+def block_deep_list(corpus: CorpusGenerator):
+    markdown = corpus.nested_list(200, 5)
+    return lambda: markdown_to_html_node(markdown)
+
+
+@benchmark("block/deep_quote")
+def block_deep_quote(corpus: CorpusGenerator):
+    markdown = corpus.nested_quote(200, 5)
+    return lambda: markdown_to_html_node(markdown)
+
+
+@benchmark("block/huge_code")
+def block_huge_code(corpus: CorpusGenerator):
+    markdown = corpus.code_block(50_000)
+    return lambda: markdown_to_html_node(markdown)
+
+
+@benchmark("render/to_html")
+def render_to_html(corpus: CorpusGenerator):
+    node = markdown_to_html_node(corpus.document(500))
+    return node.to_html
+
+
+def site_benchmark(pipeline: int) -> Callable:
+    def setup(corpus: CorpusGenerator):
+        tmp = tempfile.TemporaryDirectory()
+        content = Path(tmp.name) / "content"
+        corpus.write_tree(content, depth=3, fanout=3, pages=3)
+        template = Path(tmp.name) / "template.html"
+        template.write_text("<title>{{ Title }}</title><main>{{ Content }}</main>")
+        runs = itertools.count()
+
+        def run():
+            # Referencing tmp keeps the corpus alive as long as the benchmark is
+            dest = Path(tmp.name) / f"public{next(runs)}"
+            dest.mkdir()
+            with contextlib.redirect_stdout(io.StringIO()):
+                generate_pages_recursively(content, template, dest, None, 1, pipeline)
+
+        return run
+
+    return setup
+
+
+benchmark("site/generate_pages")(site_benchmark(0))
+benchmark("site/generate_pages_pipelined")(site_benchmark(16))
+
+
+def measure(run: Callable[[], object], repeat: int) -> Dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return {
+        "min": timings[0],
+        "median": timings[len(timings) // 2],
+        "runs": repeat,
+    }
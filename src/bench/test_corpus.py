@@ -0,0 +1,35 @@
+import unittest
+
+from bench.corpus import CorpusGenerator
+from block import markdown_to_html_node
+from inline import text_to_text_nodes
+
+
+class TestCorpusGenerator(unittest.TestCase):
+    def test_is_deterministic_for_a_seed(self):
+        self.assertEqual(
+            CorpusGenerator(7).document(50), CorpusGenerator(7).document(50)
+        )
+        self.assertNotEqual(
+            CorpusGenerator(7).document(50), CorpusGenerator(8).document(50)
+        )
+
+    def test_documents_parse(self):
+        for seed in range(5):
+            markdown = CorpusGenerator(seed).document(100)
+            self.assertTrue(markdown_to_html_node(markdown).to_html())
+
+    def test_nested_containers_render(self):
+        corpus = CorpusGenerator()
+        html = markdown_to_html_node(corpus.nested_list(50)).to_html()
+        self.assertEqual(html.count("<li>"), 2 * 99)
+        html = markdown_to_html_node(corpus.nested_quote(50)).to_html()
+        self.assertEqual(html.count("<blockquote>"), 50)
+
+    def test_link_dense_text_has_every_link(self):
+        nodes = text_to_text_nodes(CorpusGenerator().link_dense(100))
+        self.assertEqual(sum(node.url is not None for node in nodes), 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,10 +1,14 @@
 from enum import Enum
 import re
-from typing import List
+from typing import Dict, Iterable, Iterator, List, TextIO, Tuple
 
+from blockcache import BlockCache
 from htmlnode import HTMLNode
 from inline import text_to_text_nodes, text_node_to_html_node
+from leafnode import LeafNode
 from parentnode import ParentNode
+from profiler import PROFILER
+from textnode import TextNode, TextType
 from utils import all_true
 
 
@@ -31,55 +35,324 @@ class BlockType(Enum):
 
 
 def block_to_block_type(block: str) -> BlockType:
-    if block.startswith("# "):
+    return lines_to_block_type(block.split("\n"))
+
+
+def lines_to_block_type(lines: List[str]) -> BlockType:
+    first = lines[0]
+    if first.startswith("# "):
         return BlockType.HEADING1
-    if block.startswith("## "):
+    if first.startswith("## "):
         return BlockType.HEADING2
-    if block.startswith("### "):
+    if first.startswith("### "):
         return BlockType.HEADING3
-    if block.startswith("#### "):
+    if first.startswith("#### "):
         return BlockType.HEADING4
-    if block.startswith("##### "):
+    if first.startswith("##### "):
         return BlockType.HEADING5
-    if block.startswith("###### "):
+    if first.startswith("###### "):
         return BlockType.HEADING6
 
-    if block.startswith("```") and block.endswith("```"):
+    if first.startswith("```") and lines[-1].endswith("```"):
         return BlockType.CODE
 
-    lines = [line.strip() for line in block.split("\n")]
-
-    quotes = (line.startswith(">") for line in lines)
+    quotes = (line.lstrip().startswith(">") for line in lines)
     if all_true(quotes):
         return BlockType.QUOTE
 
-    ul = (line.startswith("* ") or line.startswith("- ") for line in lines)
-    if all_true(ul):
-        return BlockType.UNORDERED_LIST
+    return list_block_type(lines) or BlockType.PARAGRAPH
 
-    ol = (line.startswith(f"{i+1}. ") for i, line in enumerate(lines))
-    if all_true(ol):
-        return BlockType.ORDERED_LIST
 
-    return BlockType.PARAGRAPH
+LIST_ITEM_REGEX = re.compile(r"([ \t]*)([*-]|\d+\.) (.*)")
 
 
-def markdown_to_html_node(markdown: str) -> HTMLNode:
-    blocks = markdown_to_blocks(markdown)
-    block_nodes = []
-    for block in blocks:
-        block_type = block_to_block_type(block)
-        children = get_children(block, block_type)
-        new_node = ParentNode(block_type.value, children)
+def list_block_type(lines: List[str]) -> BlockType | None:
+    # Unindented items decide the type and must agree, indented ones open
+    # nested lists of either kind
+    ordered = None
+    number = 0
+    for line in lines:
+        match = LIST_ITEM_REGEX.fullmatch(line)
+        if match is None:
+            return None
+        if match.group(1):
+            continue
+        marker = match.group(2)
+        if ordered is None:
+            ordered = marker.endswith(".")
+        if ordered:
+            number += 1
+            if marker != f"{number}.":
+                return None
+        elif marker.endswith("."):
+            return None
+    return BlockType.ORDERED_LIST if ordered else BlockType.UNORDERED_LIST
+
+
+def strip_block_lines(lines: List[str]) -> List[str]:
+    # Same lines as "\n".join(lines).strip().split("\n"), without the copies
+    start = 0
+    while start < len(lines) and not lines[start].strip():
+        start += 1
+    end = len(lines)
+    while end > start and not lines[end - 1].strip():
+        end -= 1
+    lines = lines[start:end]
+    if lines:
+        lines[0] = lines[0].lstrip()
+        lines[-1] = lines[-1].rstrip()
+    return lines
+
+
+def iter_blocks(lines: Iterable[str]) -> Iterator[Tuple[BlockType, List[str]]]:
+    # Line by line equivalent of markdown_to_blocks + block_to_block_type.
+    # Blocks are separated by empty lines; whitespace-only blocks are kept
+    # between real blocks but dropped at both ends, as the whole document strip
+    # in markdown_to_blocks would.
+    group = []
+    started = False
+    empty_blocks = 0
+    lines = iter(lines)
+    while True:
+        line = next(lines, None)
+        if line is not None:
+            line = line.rstrip("\n")
+            if line:
+                group.append(line)
+                continue
+        if group:
+            with PROFILER.stage("split"):
+                block_lines = strip_block_lines(group)
+                group = []
+            if not block_lines:
+                empty_blocks += started
+            else:
+                for _ in range(empty_blocks):
+                    yield BlockType.PARAGRAPH, [""]
+                empty_blocks = 0
+                started = True
+                with PROFILER.stage("classify"):
+                    block_type = lines_to_block_type(block_lines)
+                yield block_type, block_lines
+        if line is None:
+            return
+
+
+HEADING_TYPES = (
+    BlockType.HEADING1,
+    BlockType.HEADING2,
+    BlockType.HEADING3,
+    BlockType.HEADING4,
+    BlockType.HEADING5,
+    BlockType.HEADING6,
+)
+
+
+def slugify(text: str) -> str:
+    slug = re.sub(r"[^\w]+", "-", text.lower()).strip("-_")
+    return slug or "section"
+
+
+class Heading:
+    __slots__ = ("level", "text", "slug")
+
+    def __init__(self, level: int, text: str, slug: str) -> None:
+        self.level = level
+        self.text = text
+        self.slug = slug
+
+    def __eq__(self, value: object) -> bool:
+        return (
+            isinstance(value, Heading)
+            and self.level == value.level
+            and self.text == value.text
+            and self.slug == value.slug
+        )
+
+    def __repr__(self) -> str:
+        return f"Heading({self.level}, {self.text!r}, {self.slug!r})"
+
+
+class Document:
+    # Everything a page needs besides its html, collected while the blocks are
+    # parsed so nothing has to scan the markdown a second time
+    def __init__(self) -> None:
+        self.root: HTMLNode | None = None
+        self.title: str | None = None
+        self.headings: List[Heading] = []
+        self.texts: List[str] = []
+        self.links: List[str] = []
+        self.images: List[str] = []
+        self.slugs: Dict[str, int] = {}
+
+    @property
+    def word_count(self) -> int:
+        return sum(len(text.split()) for text in self.texts)
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.texts)
+
+    def add_inline(self, text_nodes: List[TextNode]) -> None:
+        text = []
+        for node in text_nodes:
+            if node.text_type == TextType.IMAGE:
+                self.images.append(node.url)
+                continue
+            if node.text_type == TextType.LINK:
+                self.links.append(node.url)
+            text.append(node.text)
+        text = "".join(text).strip()
+        if text:
+            self.texts.append(text)
+
+    def mark(self) -> Tuple[int, int, int]:
+        return len(self.texts), len(self.links), len(self.images)
+
+    def since(self, mark: Tuple[int, int, int]) -> List[List[str]]:
+        texts, links, images = mark
+        return [self.texts[texts:], self.links[links:], self.images[images:]]
+
+    def extend(self, texts: List[str], links: List[str], images: List[str]) -> None:
+        self.texts.extend(texts)
+        self.links.extend(links)
+        self.images.extend(images)
+
+    def add_heading(self, level: int, text: str) -> str:
+        slug = slugify(text)
+        count = self.slugs.get(slug, 0)
+        self.slugs[slug] = count + 1
+        if count:
+            slug = f"{slug}-{count}"
+        self.headings.append(Heading(level, text, slug))
+        if level == 1 and self.title is None:
+            self.title = text
+        return slug
+
+    def toc(self) -> HTMLNode | None:
+        if not self.headings:
+            return None
+        items = [
+            ParentNode(
+                "li",
+                [LeafNode("a", heading.text, {"href": f"#{heading.slug}"})],
+                {"class": f"toc-h{heading.level}"},
+            )
+            for heading in self.headings
+        ]
+        return ParentNode("ul", items, {"class": "toc"})
+
+
+block_cache: BlockCache | None = None
+
+
+def set_block_cache(cache: BlockCache | None) -> None:
+    global block_cache
+    block_cache = cache
+
+
+def get_block_cache() -> BlockCache | None:
+    return block_cache
+
+
+def block_to_html_node(
+    block_type: BlockType,
+    lines: List[str],
+    block: str | None = None,
+    document: Document | None = None,
+    anchors: bool = False,
+) -> HTMLNode:
+    if block is None:
+        block = "\n".join(lines)
+    if document is None:
+        document = Document()
+    mark = document.mark()
+    heading = block_type in HEADING_TYPES
+
+    # Anchored headings depend on the slugs seen earlier in the page, so
+    # only context-free blocks can go through the cache
+    if block_cache is None or (anchors and heading):
+        node = build_block_node(block_type, lines, block, document)
+    else:
+        # Repeated boilerplate blocks are parsed once and reused as raw html,
+        # along with what they add to the document
+        key = block_cache.key(block_type.value, block, block_cache.salt)
+        cached = block_cache.get(key)
+        if cached is None:
+            html = build_block_node(block_type, lines, block, document).to_html()
+            block_cache.put(key, [html] + document.since(mark))
+        else:
+            html, texts, links, images = cached
+            document.extend(texts, links, images)
+        node = LeafNode(None, html)
+
+    if heading:
+        text = " ".join(document.texts[mark[0] :])
+        slug = document.add_heading(int(block_type.value[1]), text)
+        if anchors:
+            node.props = {"id": slug}
+    return node
+
+
+def build_block_node(
+    block_type: BlockType,
+    lines: List[str],
+    block: str,
+    document: Document | None = None,
+) -> HTMLNode:
+    children = get_children(block, block_type, lines, document)
+    with PROFILER.stage("tree"):
+        node = ParentNode(block_type.value, children)
         if block_type == BlockType.CODE:
-            new_node = ParentNode("pre", [new_node])
-        block_nodes.append(new_node)
+            node = ParentNode("pre", [node])
+    return node
+
+
+def iter_block_nodes(lines: Iterable[str]) -> Iterator[HTMLNode]:
+    for block_type, block_lines in iter_blocks(lines):
+        yield block_to_html_node(block_type, block_lines)
+
+
+def write_markdown_html(lines: Iterable[str], fp: TextIO) -> None:
+    # Streams a document, e.g. an open file, block by block into fp so memory
+    # stays bounded by the largest block instead of the whole document
+    fp.write("<div>")
+    for node in iter_block_nodes(lines):
+        node.write_html(fp)
+    fp.write("</div>")
+
+
+def markdown_to_document(
+    markdown: str | Iterable[str], anchors: bool = False
+) -> Document:
+    if isinstance(markdown, str):
+        markdown = markdown.split("\n")
+    document = Document()
+    block_nodes = [
+        block_to_html_node(block_type, block_lines, None, document, anchors)
+        for block_type, block_lines in iter_blocks(markdown)
+    ]
+    document.root = ParentNode("div", block_nodes)
+    return document
+
+
+def markdown_to_html_node(markdown: str) -> HTMLNode:
+    return markdown_to_document(markdown).root
 
-    root_node = ParentNode("div", block_nodes)
-    return root_node
 
+def get_children(
+    block: str,
+    block_type: BlockType,
+    lines: List[str] | None = None,
+    document: Document | None = None,
+) -> List[HTMLNode]:
+    if lines is None and block_type in (
+        BlockType.QUOTE,
+        BlockType.UNORDERED_LIST,
+        BlockType.ORDERED_LIST,
+    ):
+        lines = block.split("\n")
 
-def get_children(block: str, block_type: BlockType) -> List[HTMLNode]:
     match block_type:
         case BlockType.PARAGRAPH:
             inline_text = block
@@ -94,20 +367,107 @@ def get_children(block: str, block_type: BlockType) -> List[HTMLNode]:
             inline_text = block.lstrip("# ")
         case BlockType.CODE:
             inline_text = block.strip("`\n ")
-        case BlockType.QUOTE:
-            inline_text = " ".join(
-                line.lstrip(">").strip() for line in block.split("\n")
-            )
         case BlockType.LIST_ITEM:
             inline_text = block.split(" ", maxsplit=1)[1]
-        case BlockType.UNORDERED_LIST | BlockType.ORDERED_LIST:
-            items = (line for line in block.split("\n"))
-            children = [get_children(line, BlockType.LIST_ITEM) for line in items]
-            children = [ParentNode("li", child) for child in children]
-            return children
+        case BlockType.QUOTE | BlockType.UNORDERED_LIST | BlockType.ORDERED_LIST:
+            return container_children(block_type, lines, document)
         case _:
             raise Exception(f"Unknown block type: {block_type.name}")
 
-    text_nodes = text_to_text_nodes(inline_text)
-    html_nodes = [text_node_to_html_node(node) for node in text_nodes]
+    return inline_children(inline_text, document)
+
+
+def inline_children(
+    inline_text: str, document: Document | None = None
+) -> List[HTMLNode]:
+    with PROFILER.stage("inline"):
+        text_nodes = text_to_text_nodes(inline_text)
+    if document is not None:
+        document.add_inline(text_nodes)
+    with PROFILER.stage("tree"):
+        html_nodes = [text_node_to_html_node(node) for node in text_nodes]
     return html_nodes
+
+
+QUOTE_FRAME = -1
+# "> > a" nests like ">> a", whitespace between markers does not count
+QUOTE_MARKERS_REGEX = re.compile(r">(?:[ \t]*>)*")
+
+
+def container_children(
+    block_type: BlockType, lines: List[str], document: Document | None = None
+) -> List[HTMLNode]:
+    # Containers still open, innermost last, as (node, quote depth, item indent)
+    # with QUOTE_FRAME as the indent of quotes. Each line opens or closes every
+    # container at most once, so the work stays linear however deep it nests.
+    quoted = block_type == BlockType.QUOTE
+    root = ParentNode(block_type.value, [])
+    stack = [(root, 1, QUOTE_FRAME) if quoted else (root, 0, 0)]
+    text: List[str] = []
+
+    def flush_text() -> None:
+        # Quote text goes straight into the quote, as in a simple blockquote
+        if text:
+            stack[-1][0].children.extend(inline_children(" ".join(text), document))
+            text.clear()
+
+    for line in lines:
+        depth, content = 0, line
+        if quoted:
+            stripped = line.strip()
+            markers = QUOTE_MARKERS_REGEX.match(stripped)
+            if markers is not None:
+                depth = markers.group().count(">")
+                content = stripped[markers.end() :]
+            else:
+                content = stripped
+            if content.startswith(" "):
+                content = content[1:]
+            if not content.strip():
+                # An empty line never opens a quote, it would have no children
+                depth = min(depth, stack[-1][1])
+        item = LIST_ITEM_REGEX.fullmatch(content)
+
+        # Close deeper quotes, and lists when the line is not an item
+        while len(stack) > 1 and (
+            stack[-1][1] > depth or (item is None and stack[-1][2] != QUOTE_FRAME)
+        ):
+            flush_text()
+            stack.pop()
+        if depth > stack[-1][1]:
+            flush_text()
+            while stack[-1][2] != QUOTE_FRAME:
+                stack.pop()
+            while stack[-1][1] < depth:
+                quote = ParentNode(BlockType.QUOTE.value, [])
+                stack[-1][0].children.append(quote)
+                stack.append((quote, stack[-1][1] + 1, QUOTE_FRAME))
+
+        if item is None:
+            text.append(content.strip())
+            continue
+
+        flush_text()
+        indent = len(item.group(1).expandtabs(4))
+        while stack[-1][2] > indent:
+            stack.pop()
+        node, _, open_indent = stack[-1]
+        if open_indent != indent:
+            # A deeper item nests in the last item of the list above it
+            parent = node if open_indent == QUOTE_FRAME else node.children[-1]
+            list_type = (
+                BlockType.ORDERED_LIST
+                if item.group(2).endswith(".")
+                else BlockType.UNORDERED_LIST
+            )
+            node = ParentNode(list_type.value, [])
+            parent.children.append(node)
+            stack.append((node, depth, indent))
+        node.children.append(
+            ParentNode(
+                BlockType.LIST_ITEM.value, inline_children(item.group(3), document)
+            )
+        )
+
+    flush_text()
+    return root.children
@@ -0,0 +1,90 @@
+from collections import OrderedDict
+import hashlib
+import json
+from pathlib import Path
+from typing import List, Tuple
+
+from manifest import parser_version
+
+
+class BlockCache:
+    def __init__(self, max_entries: int = 10_000, path: Path | None = None) -> None:
+        self.max_entries = max_entries
+        self.path = path
+        self.entries: OrderedDict[str, list] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.version = parser_version()
+        # Mixed into every key when the html depends on more than the block
+        self.salt = ""
+        # Set in worker processes, whose entries are merged by the parent
+        self.record_new = False
+        self.new: List[str] = []
+
+    @staticmethod
+    def key(block_type_value: str, block: str, salt: str = "") -> str:
+        digest = hashlib.sha256(block_type_value.encode())
+        digest.update(b"\0")
+        digest.update(block.encode())
+        if salt:
+            digest.update(b"\0")
+            digest.update(salt.encode())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> list | None:
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, entry: list) -> None:
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        if self.record_new:
+            self.new.append(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def take_new(self) -> Tuple[List[Tuple[str, list]], int, int]:
+        # What this cache learned since the last call, and its hits and misses
+        new = [(key, self.entries[key]) for key in self.new if key in self.entries]
+        learned = (new, self.hits, self.misses)
+        self.new, self.hits, self.misses = [], 0, 0
+        return learned
+
+    def merge(self, entries: List[Tuple[str, list]], hits: int, misses: int) -> None:
+        for key, entry in entries:
+            self.put(key, entry)
+        self.hits += hits
+        self.misses += misses
+
+    def load(self) -> None:
+        if self.path is None:
+            return
+        try:
+            with open(self.path) as cache_file:
+                data = json.load(cache_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        if data.get("version") != self.version:
+            return
+        for key, entry in data["entries"][-self.max_entries :]:
+            self.entries[key] = entry
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, mode="w") as cache_file:
+            json.dump(
+                {"version": self.version, "entries": list(self.entries.items())},
+                cache_file,
+            )
+
+    def stats(self) -> str:
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0.0
+        return f"{self.hits} hits, {self.misses} misses ({rate:.0f}% hit rate)"
@@ -0,0 +1,127 @@
+import bz2
+from concurrent.futures import Future, ThreadPoolExecutor
+import gzip
+import json
+import lzma
+import os
+from pathlib import Path
+import shutil
+import threading
+from typing import BinaryIO, Callable, Dict, Iterable, List
+
+from manifest import file_hash
+
+
+def open_gzip(fp: BinaryIO) -> BinaryIO:
+    # A fixed mtime keeps the output byte for byte reproducible
+    return gzip.GzipFile(fileobj=fp, mode="wb", compresslevel=9, mtime=0)
+
+
+CODECS: Dict[str, Callable[[BinaryIO], BinaryIO]] = {
+    "gz": open_gzip,
+    "xz": lambda fp: lzma.LZMAFile(fp, mode="wb", preset=6),
+    "bz2": lambda fp: bz2.BZ2File(fp, mode="wb", compresslevel=9),
+}
+COMPRESSIBLE = {".html", ".css", ".js", ".json", ".svg", ".txt", ".xml"}
+
+
+class Compressor:
+    def __init__(
+        self,
+        root: Path,
+        codecs: Iterable[str] = ("gz",),
+        state_path: Path | None = None,
+        workers: int = 4,
+    ) -> None:
+        self.root = root
+        self.codecs = list(codecs)
+        for codec in self.codecs:
+            if codec not in CODECS:
+                raise ValueError(f"Unknown compression codec: {codec}")
+        self.state_path = state_path
+        # Content hash of each output when its compressed siblings were written
+        self.hashes: Dict[str, str] = {}
+        self.lock = threading.Lock()
+        # zlib, lzma and bz2 release the GIL, so threads compress in parallel
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.pending: List[Future] = []
+        self.compressed = 0
+
+    def load(self) -> None:
+        if self.state_path is None:
+            return
+        try:
+            with open(self.state_path) as state_file:
+                self.hashes = json.load(state_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.hashes = {}
+
+    def save(self) -> None:
+        if self.state_path is None:
+            return
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.state_path, mode="w") as state_file:
+            json.dump(self.hashes, state_file, indent=1, sort_keys=True)
+
+    def outputs(self, path: Path) -> List[Path]:
+        if path.suffix not in COMPRESSIBLE:
+            return []
+        return [path.with_name(f"{path.name}.{codec}") for codec in self.codecs]
+
+    def submit(self, path: Path, digest: str | None = None) -> None:
+        if path.suffix in COMPRESSIBLE:
+            self.pending.append(self.pool.submit(self.compress, path, digest))
+
+    def compress(self, path: Path, digest: str | None = None) -> bool:
+        key = str(path.relative_to(self.root))
+        digest = digest or file_hash(path)
+        outputs = self.outputs(path)
+        with self.lock:
+            fresh = self.hashes.get(key) == digest
+        if fresh and all(output.exists() for output in outputs):
+            return False
+
+        for codec, output in zip(self.codecs, outputs):
+            tmp = output.with_name(f".{output.name}.tmp")
+            # Streams chunk by chunk, large pages are never read in whole
+            with open(path, "rb") as source, open(tmp, "wb") as tmp_file:
+                with CODECS[codec](tmp_file) as compressed:
+                    shutil.copyfileobj(source, compressed, 1 << 16)
+            os.replace(tmp, output)
+        with self.lock:
+            self.hashes[key] = digest
+            self.compressed += 1
+        return True
+
+    def remove(self, path: Path) -> None:
+        with self.lock:
+            self.hashes.pop(str(path.relative_to(self.root)), None)
+        for output in self.outputs(path):
+            output.unlink(missing_ok=True)
+        if path.parent == self.root:
+            return
+        try:
+            path.parent.rmdir()
+        except OSError:
+            pass
+
+    def wait(self) -> List[Exception]:
+        errors = []
+        for future in self.pending:
+            error = future.exception()
+            if error is not None:
+                errors.append(error)
+        self.pending = []
+        return errors
+
+    def close(self) -> List[Exception]:
+        errors = self.wait()
+        self.pool.shutdown()
+        # Outputs that are gone, e.g. after a clean build, drop out of the state
+        self.hashes = {
+            key: digest
+            for key, digest in self.hashes.items()
+            if (self.root / key).exists()
+        }
+        self.save()
+        return errors
@@ -1,6 +1,29 @@
+from concurrent.futures import ProcessPoolExecutor
+import io
 from pathlib import Path
+import queue
+import threading
+from typing import Callable, Dict, List, Tuple
 
-from block import markdown_to_html_node
+from block import Document, get_block_cache, markdown_to_document, set_block_cache
+from blockcache import BlockCache
+from compress import Compressor
+from htmlnode import HTMLNode
+from inline import (
+    get_image_resolver,
+    get_inline_parser,
+    set_image_resolver,
+    set_inline_parser,
+)
+from links import LinkChecker
+from manifest import HashingWriter, Manifest, text_hash
+from minify import HtmlMinifier, minifier_version
+from parsecache import ParseCache
+from profiler import PROFILER
+from progress import Progress
+from search import SearchIndex
+from staging import replace_if_changed
+from template import Template, TemplateLoader, is_template_file
 
 
 def extract_title(markdown: str):
@@ -11,41 +34,413 @@ def extract_title(markdown: str):
     raise Exception("Document has no h1 header")
 
 
-def generate_page(from_path: Path, template_path: Path, dest_path: Path) -> None:
-    print(
-        "Generating page:\n"
-        f"  From:  {from_path}\n"
-        f"  To:    {dest_path}\n"
-        f"  Using: {template_path}"
-    )
-    with open(from_path) as markdown_file:
-        markdown = markdown_file.read()
-    html = markdown_to_html_node(markdown).to_html()
-    title = extract_title(markdown)
+# Not valid slot names, so page data never ends up in a template
+TEXT_KEY = "#text"
+LINKS_KEY = "#links"
 
-    with open(template_path) as template_file:
-        template = template_file.read()
-    page = template
-    page = page.replace("{{ Title }}", title)
-    page = page.replace("{{ Content }}", html)
 
-    with open(dest_path, mode="x") as dest_file:
-        dest_file.write(page)
+def page_values(document: Document, toc: bool = False) -> Dict[str, str | HTMLNode]:
+    if document.title is None:
+        raise Exception("Document has no h1 header")
+    values = {"Title": document.title, "Content": document.root}
+    values[TEXT_KEY] = document.text
+    values[LINKS_KEY] = document.links + document.images
+    if toc:
+        values["Toc"] = document.toc() or ""
+    return values
 
 
-def generate_pages_recursively(
-    dir_path_content: Path, template_path: Path, dest_dir_path: Path
+def render_values(values: Dict[str, str | HTMLNode]) -> Dict[str, str]:
+    return {
+        slot: value.to_html() if isinstance(value, HTMLNode) else value
+        for slot, value in values.items()
+    }
+
+
+parse_cache: ParseCache | None = None
+
+
+def set_parse_cache(cache: ParseCache | None) -> None:
+    global parse_cache
+    parse_cache = cache
+
+
+compressor: Compressor | None = None
+
+
+def set_compressor(pages_compressor: Compressor | None) -> None:
+    global compressor
+    compressor = pages_compressor
+
+
+search_index: SearchIndex | None = None
+
+
+def set_search_index(index: SearchIndex | None) -> None:
+    global search_index
+    search_index = index
+
+
+link_checker: LinkChecker | None = None
+
+
+def set_link_checker(checker: LinkChecker | None) -> None:
+    global link_checker
+    link_checker = checker
+
+
+minify_pages = False
+minify_version = ""
+
+
+def set_minify_pages(enabled: bool) -> None:
+    global minify_pages, minify_version
+    minify_pages = enabled
+    minify_version = minifier_version() if enabled else ""
+
+
+class PageJob:
+    def __init__(self, from_path: Path, template: Template, dest_path: Path) -> None:
+        self.from_path = from_path
+        self.template = template
+        self.dest_path = dest_path
+        self.markdown = ""
+        self.source_hash = ""
+
+    def read(self, manifest: Manifest | None = None) -> bool:
+        with PROFILER.stage("read"), open(self.from_path) as markdown_file:
+            self.markdown = markdown_file.read()
+
+        if manifest is None:
+            return True
+        manifest.touch(self.from_path)
+        fresh = manifest.is_fresh(
+            self.from_path, self.dest_path, self.content_hash(), self.template_digest
+        )
+        if fresh and search_index is not None:
+            # Rendered again when the index has no entry for this source, e.g.
+            # on the first build with --search or after edits built without it
+            fresh = search_index.is_current(str(self.from_path), self.content_hash())
+        if fresh and compressor is not None:
+            # Unchanged pages are offered too, their siblings may be missing
+            output = manifest.pages[str(self.from_path)]["output"]
+            compressor.submit(self.dest_path, output)
+        return not fresh
+
+    def content_hash(self) -> str:
+        if not self.source_hash:
+            self.source_hash = text_hash(self.markdown)
+        return self.source_hash
+
+    @property
+    def template_digest(self) -> str:
+        # Plain output and that of each minifier version are different pages
+        return self.template.digest + (f"-min-{minify_version}" if minify_pages else "")
+
+    @property
+    def toc(self) -> bool:
+        # Headings only get anchors when the template has somewhere to link them
+        return "Toc" in self.template.slots
+
+    def cache_key(self) -> str:
+        return self.content_hash() + ("-toc" if self.toc else "")
+
+    def cached(self) -> Dict[str, str] | None:
+        if parse_cache is None:
+            return None
+        values = parse_cache.get(self.cache_key())
+        if values is not None and not (TEXT_KEY in values and LINKS_KEY in values):
+            # Written before page data was cached along with the html
+            return None
+        return values
+
+    def store(self, values: Dict[str, str]) -> None:
+        if parse_cache is not None:
+            parse_cache.put(self.cache_key(), values)
+
+    def write(
+        self, values: Dict[str, str | HTMLNode], manifest: Manifest | None = None
+    ) -> None:
+        title, text = values.get("Title"), values.get(TEXT_KEY)
+        links = values.get(LINKS_KEY, [])
+        if PROFILER.enabled:
+            # Render, fill and write one after the other so each gets timed
+            with PROFILER.stage("render"):
+                values = render_values(values)
+            with PROFILER.stage("template"):
+                page = io.StringIO()
+                self.template.render(page, values)
+            values = {"Content": page.getvalue()}
+            template = Template("{{ Content }}")
+        else:
+            template = self.template
+
+        # Pages are written next to their destination and renamed over it, so
+        # a page that fails half way never replaces the previous output
+        tmp = self.dest_path.with_name(f".{self.dest_path.name}.tmp")
+        with PROFILER.stage("write"):
+            with open(tmp, mode="w") as tmp_file:
+                writer = HashingWriter(tmp_file)
+                try:
+                    if minify_pages:
+                        # Hashes the minified page, that is what gets written
+                        minifier = HtmlMinifier(writer)
+                        template.render(minifier, values)
+                        minifier.close()
+                    else:
+                        template.render(writer, values)
+                except Exception:
+                    tmp_file.close()
+                    tmp.unlink()
+                    raise
+            replace_if_changed(tmp, self.dest_path, writer.hexdigest())
+        if compressor is not None:
+            compressor.submit(self.dest_path, writer.hexdigest())
+        if search_index is not None and text is not None:
+            search_index.add(
+                str(self.from_path), self.dest_path, title, text, self.content_hash()
+            )
+        if link_checker is not None:
+            link_checker.check(self.dest_path, links)
+
+        if manifest is not None:
+            manifest.record(
+                self.from_path,
+                self.dest_path,
+                self.source_hash,
+                self.template_digest,
+                writer.hexdigest(),
+                links,
+            )
+
+    def generate(self, manifest: Manifest | None = None) -> bool:
+        with PROFILER.page(str(self.from_path)):
+            if not self.read(manifest):
+                return False
+            cached = self.cached()
+            if cached is not None:
+                self.write(cached, manifest)
+                return True
+
+            with PROFILER.stage("parse"):
+                document = markdown_to_document(self.markdown, anchors=self.toc)
+            values = page_values(document, self.toc)
+            if parse_cache is None:
+                self.write(values, manifest)
+                return True
+
+            # The cache needs the content as strings, so it is not streamed
+            values = render_values(values)
+            self.store(values)
+            self.write(values, manifest)
+            return True
+
+
+def render_markdown(markdown: str, toc: bool = False) -> Dict[str, str]:
+    document = markdown_to_document(markdown, anchors=toc)
+    return render_values(page_values(document, toc))
+
+
+def init_worker(
+    cache: BlockCache | None,
+    parser: str,
+    resolver: Callable[[str], Dict[str, str] | None] | None,
 ) -> None:
+    # Module state is handed over explicitly, workers are not always forked
+    if cache is not None:
+        cache.record_new = True
+    set_block_cache(cache)
+    set_inline_parser(parser)
+    set_image_resolver(resolver)
+
+
+def render_in_worker(
+    markdown: str, toc: bool = False
+) -> Tuple[Dict[str, str], Tuple | None]:
+    values = render_markdown(markdown, toc)
+    cache = get_block_cache()
+    # New cache entries go back to the parent, which owns the real cache
+    return values, cache.take_new() if cache is not None else None
+
+
+def generate_page(
+    from_path: Path,
+    template_path: Path,
+    dest_path: Path,
+    manifest: Manifest | None = None,
+) -> bool:
+    template = TemplateLoader(template_path).load(template_path)
+    return PageJob(from_path, template, dest_path).generate(manifest)
+
+
+def collect_page_jobs(
+    dir_path_content: Path, templates: TemplateLoader, dest_dir_path: Path
+) -> List[PageJob]:
+    jobs = []
     for item in dir_path_content.iterdir():
         if item.is_dir():
             dest_subdir = dest_dir_path / item.name
-            dest_subdir.mkdir()
-            generate_pages_recursively(item, template_path, dest_dir_path / item.name)
+            dest_subdir.mkdir(exist_ok=True)
+            jobs.extend(collect_page_jobs(item, templates, dest_subdir))
         elif item.suffix == ".md":
             dest_filename = item.stem + ".html"
-            try:
-                generate_page(item, template_path, dest_dir_path / dest_filename)
-            except Exception as e:
-                print(f"Could not generate {item}. Error:\n  {e}")
+            template = templates.for_page(item)
+            jobs.append(PageJob(item, template, dest_dir_path / dest_filename))
+        elif is_template_file(item):
+            continue
         else:
             print(f"Ignoring item, unrecognized type: {item}")
+    return jobs
+
+
+def generate_pages_recursively(
+    dir_path_content: Path,
+    template_path: Path,
+    dest_dir_path: Path,
+    manifest: Manifest | None = None,
+    workers: int = 1,
+    pipeline: int = 0,
+) -> List[PageJob]:
+    # Each template is compiled once and shared by every page that uses it
+    templates = TemplateLoader(template_path, dir_path_content)
+    jobs = collect_page_jobs(dir_path_content, templates, dest_dir_path)
+    if link_checker is not None:
+        # Every page is known before the first one renders, so links can be
+        # checked as soon as their page is written
+        link_checker.add_targets(job.dest_path for job in jobs)
+    progress = Progress(len(jobs))
+    if workers > 1:
+        generate_pages_parallel(jobs, manifest, workers, progress)
+        return jobs
+    if pipeline > 0:
+        generate_pages_pipelined(jobs, manifest, progress, pipeline)
+        return jobs
+
+    skipped = 0
+    for job in jobs:
+        try:
+            skipped += not job.generate(manifest)
+        except Exception as e:
+            progress.fail(f"Could not generate {job.from_path}. Error:\n  {e}")
+        progress.advance()
+    progress.finish(skipped)
+    return jobs
+
+
+def generate_pages_parallel(
+    jobs: List[PageJob], manifest: Manifest | None, workers: int, progress: Progress
+) -> None:
+    # Workers only turn markdown into html; reading, writing and error reporting
+    # stay in this process so the output and the log order match a serial build
+    cache = get_block_cache()
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=init_worker,
+        initargs=(cache, get_inline_parser(), get_image_resolver()),
+    ) as pool:
+        pending = []
+        for job in jobs:
+            try:
+                if not job.read(manifest):
+                    continue
+                cached = job.cached()
+                if cached is not None:
+                    pending.append((job, cached))
+                else:
+                    pending.append(
+                        (job, pool.submit(render_in_worker, job.markdown, job.toc))
+                    )
+            except Exception as e:
+                pending.append((job, e))
+
+        skipped = len(jobs) - len(pending)
+        progress.advance(skipped)
+        for job, result in pending:
+            try:
+                if isinstance(result, Exception):
+                    raise result
+                if isinstance(result, dict):
+                    values = result
+                else:
+                    values, learned = result.result()
+                    if cache is not None and learned is not None:
+                        cache.merge(*learned)
+                    job.store(values)
+                job.write(values, manifest)
+            except Exception as e:
+                progress.fail(f"Could not generate {job.from_path}. Error:\n  {e}")
+            progress.advance()
+        progress.finish(skipped)
+
+
+WRITE_BATCH = 32
+
+
+def generate_pages_pipelined(
+    jobs: List[PageJob], manifest: Manifest | None, progress: Progress, depth: int
+) -> None:
+    # A reader thread prefetches sources and a writer thread flushes pages while
+    # this thread parses, so slow storage is waited on during CPU work. The
+    # bounded queues keep at most 2 * depth pages in memory.
+    read_queue = queue.Queue(maxsize=depth)
+    write_queue = queue.Queue(maxsize=depth)
+    skipped = 0
+
+    def read_stage() -> None:
+        for job in jobs:
+            try:
+                read_queue.put((job, job.read(manifest)))
+            except Exception as e:
+                read_queue.put((job, e))
+        read_queue.put(None)
+
+    def write_stage() -> None:
+        done = False
+        while not done:
+            # Block for one page, then take whatever else is already waiting
+            batch = [write_queue.get()]
+            while len(batch) < WRITE_BATCH:
+                try:
+                    batch.append(write_queue.get_nowait())
+                except queue.Empty:
+                    break
+            if batch[-1] is None:
+                batch.pop()
+                done = True
+            for job, result in batch:
+                try:
+                    if isinstance(result, Exception):
+                        raise result
+                    job.write(result, manifest)
+                except Exception as e:
+                    progress.fail(f"Could not generate {job.from_path}. Error:\n  {e}")
+            progress.advance(len(batch))
+
+    reader = threading.Thread(target=read_stage, daemon=True)
+    writer = threading.Thread(target=write_stage, daemon=True)
+    reader.start()
+    writer.start()
+    try:
+        while (item := read_queue.get()) is not None:
+            job, result = item
+            if result is False:
+                skipped += 1
+                progress.advance()
+                continue
+            if result is True:
+                try:
+                    result = job.cached()
+                    if result is None:
+                        result = render_markdown(job.markdown, job.toc)
+                        job.store(result)
+                except Exception as e:
+                    result = e
+            # Sources are not needed past this point, drop them early, but keep
+            # their hash for the search index
+            job.content_hash()
+            job.markdown = ""
+            write_queue.put((job, result))
+    finally:
+        write_queue.put(None)
+        writer.join()
+    progress.finish(skipped)
@@ -1,7 +1,11 @@
-from typing import Dict, List, Self
+from typing import Dict, Iterator, List, Self, TextIO
 
 
 class HTMLNode:
+    # Long documents create tens of thousands of nodes, slots keep each one
+    # small and subclasses add no per-instance dict of their own
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(
         self,
         tag: str | None = None,
@@ -17,6 +21,13 @@ class HTMLNode:
     def to_html(self):
         raise NotImplementedError
 
+    def iter_html(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def write_html(self, fp: TextIO) -> None:
+        for fragment in self.iter_html():
+            fp.write(fragment)
+
     def props_to_html(self):
         if self.props is None:
             return ""
@@ -1,5 +1,5 @@
 import re
-from typing import List, Tuple, Callable
+from typing import Dict, List, Tuple, Callable
 
 from leafnode import LeafNode
 from textnode import TextNode, TextType
@@ -18,12 +18,49 @@ def text_node_to_html_node(text_node: TextNode) -> LeafNode:
         case TextType.LINK:
             return LeafNode("a", text_node.text, {"href": text_node.url})
         case TextType.IMAGE:
-            return LeafNode("img", "", {"src": text_node.url, "alt": text_node.text})
+            props = {"src": text_node.url, "alt": text_node.text}
+            if image_resolver is not None:
+                props.update(image_resolver(text_node.url) or {})
+            return LeafNode("img", "", props)
         case _:
             raise Exception("Unknown text node type")
 
 
+# Maps an image url to extra or replacement <img> attributes, or None
+image_resolver: Callable[[str], Dict[str, str] | None] | None = None
+
+
+def set_image_resolver(resolver: Callable[[str], Dict[str, str] | None] | None):
+    global image_resolver
+    image_resolver = resolver
+
+
+def get_image_resolver() -> Callable[[str], Dict[str, str] | None] | None:
+    return image_resolver
+
+
+INLINE_PARSERS = ("scan", "split")
+inline_parser = "scan"
+
+
+def set_inline_parser(name: str) -> None:
+    global inline_parser
+    if name not in INLINE_PARSERS:
+        raise ValueError(f"Unknown inline parser: {name}")
+    inline_parser = name
+
+
+def get_inline_parser() -> str:
+    return inline_parser
+
+
 def text_to_text_nodes(text: str) -> List[TextNode]:
+    if inline_parser == "split":
+        return split_text_to_text_nodes(text)
+    return scan_text_to_text_nodes(text)
+
+
+def split_text_to_text_nodes(text: str) -> List[TextNode]:
     nodes = [TextNode(text, TextType.NORMAL)]
     nodes = split_nodes_images(nodes)
     nodes = split_nodes_links(nodes)
@@ -37,28 +74,32 @@ def text_to_text_nodes(text: str) -> List[TextNode]:
 MD_IMAGE_REGEX = r"!\[(.*?)\]\((.+?)\)"
 MD_LINK_REGEX = r"(?<!!)\[(.+?)\]\((.+?)\)"
 
-
-# TODO: consolidate the extract_ methods to avoid doing the match twice
-def extract_markdown_images(text: str) -> List[Tuple[str, str]]:
-    return re.findall(MD_IMAGE_REGEX, text)
+MD_IMAGE_PATTERN = re.compile(MD_IMAGE_REGEX)
+MD_LINK_PATTERN = re.compile(MD_LINK_REGEX)
+MD_REFERENCE_PATTERN = re.compile(f"{MD_IMAGE_REGEX}|{MD_LINK_REGEX}")
 
 
-def extract_markdown_indeces_images(text: str) -> List[Tuple[int, int]]:
-    return (
-        (match.start(1) - 2, match.end(2) + 1)
-        for match in re.finditer(MD_IMAGE_REGEX, text)
-    )
+def extract_markdown_images(text: str) -> List[Tuple[str, str]]:
+    return MD_IMAGE_PATTERN.findall(text)
 
 
 def extract_markdown_links(text: str) -> List[Tuple[str, str]]:
-    return re.findall(MD_LINK_REGEX, text)
+    return MD_LINK_PATTERN.findall(text)
 
 
-def extract_markdown_indeces_links(text: str) -> List[Tuple[int, int]]:
-    return (
-        (match.start(1) - 1, match.end(2) + 1)
-        for match in re.finditer(MD_LINK_REGEX, text)
-    )
+def extract_markdown_references(
+    text: str,
+) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+    # Images and links of a whole document in a single scan
+    images = []
+    links = []
+    for match in MD_REFERENCE_PATTERN.finditer(text):
+        image_alt, image_url, link_text, link_url = match.groups()
+        if image_url is not None:
+            images.append((image_alt, image_url))
+        else:
+            links.append((link_text, link_url))
+    return images, links
 
 
 def split_nodes(
@@ -85,33 +126,24 @@ def split_nodes_processor(
     ]
 
 
-def extractor_function(
-    tuple_extractor: Callable[[str], List[Tuple[str, str]]],
-    index_extractor: Callable[[str], List[Tuple[int, int]]],
-):
-    def decorator(_):
-        def inner(text: str, url: str) -> List[Tuple[str, str | None]]:
-            chunks = []
-            tuples = tuple_extractor(text)
-            indeces = index_extractor(text)
-            for (extracted_text, extracted_url), (start, end) in zip(tuples, indeces):
-                chunks.append((text[:start], url))
-                chunks.append((extracted_text, extracted_url))
-                text = text[end:]
-            chunks.append((text, url))
-            return chunks
-
-        return inner
-
-    return decorator
+def pattern_extractor_factory(pattern: re.Pattern):
+    def extractor(text: str, url: str) -> List[Tuple[str, str | None]]:
+        # One finditer over the text; chunks are sliced by offset, never by
+        # re-copying the rest of the text after every match
+        chunks = []
+        position = 0
+        for match in pattern.finditer(text):
+            chunks.append((text[position : match.start()], url))
+            chunks.append(match.groups())
+            position = match.end()
+        chunks.append((text[position:], url))
+        return chunks
 
+    return extractor
 
-@extractor_function(extract_markdown_images, extract_markdown_indeces_images)
-def extractor_images(text: str, url: str) -> List[Tuple[str, str | None]]: ...
 
-
-@extractor_function(extract_markdown_links, extract_markdown_indeces_links)
-def extractor_links(text: str, url: str) -> List[Tuple[str, str | None]]: ...
+extractor_images = pattern_extractor_factory(MD_IMAGE_PATTERN)
+extractor_links = pattern_extractor_factory(MD_LINK_PATTERN)
 
 
 def extractor_delimiter_factory(delimiter: str):
@@ -138,3 +170,43 @@ def split_node_delimiter(
     old_nodes: List[TextNode], delimiter: str, text_type: TextType
 ) -> List[TextNode]:
     return split_nodes(old_nodes, extractor_delimiter_factory(delimiter), text_type)
+
+
+# Every stage of split_text_to_text_nodes, with a marker that must be present in
+# the text for the stage to split it at all
+INLINE_STAGES = (
+    ("](", extractor_images, TextType.IMAGE),
+    ("](", extractor_links, TextType.LINK),
+    ("**", extractor_delimiter_factory("**"), TextType.BOLD),
+    ("*", extractor_delimiter_factory("*"), TextType.ITALIC),
+    ("_", extractor_delimiter_factory("_"), TextType.ITALIC),
+    ("`", extractor_delimiter_factory("`"), TextType.CODE),
+)
+
+
+def scan_text_to_text_nodes(text: str) -> List[TextNode]:
+    # Walks the text once, left to right, sending each chunk through the
+    # remaining stages before moving on. Only the final nodes get built and
+    # stages whose marker is absent are skipped, but the output is the same as
+    # running the six split passes over the whole node list. Malformed text
+    # still raises, though the error may quote a different chunk.
+    nodes = []
+    scan_chunk(text, TextType.NORMAL, None, 0, nodes)
+    return nodes
+
+
+def scan_chunk(
+    text: str, text_type: TextType, url: str | None, stage: int, nodes: List[TextNode]
+) -> None:
+    if not (text or url):
+        return
+    while stage < len(INLINE_STAGES) and INLINE_STAGES[stage][0] not in text:
+        stage += 1
+    if stage == len(INLINE_STAGES):
+        nodes.append(TextNode(text, text_type, url))
+        return
+
+    _, extractor, odd_type = INLINE_STAGES[stage]
+    types = (text_type, odd_type)
+    for i, (chunk_text, chunk_url) in enumerate(extractor(text, url)):
+        scan_chunk(chunk_text, types[i % 2], chunk_url, stage + 1, nodes)
@@ -1,18 +1,27 @@
-from typing import Dict, Self
+from typing import Dict, Iterator
 from htmlnode import HTMLNode
 
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(
         self,
         tag: str | None,
         value: str,
         props: Dict[str, str] | None = None,
     ) -> None:
-        super().__init__(tag, value, None, props)
+        # Assigned directly, skipping the super() call on this very hot path
+        self.tag = tag
+        self.value = value
+        self.children = None
+        self.props = props
 
     def to_html(self):
         if not self.tag:
             return self.value
         open, close = self.tag_to_html_tags()
         return f"{open}{self.value}{close}"
+
+    def iter_html(self) -> Iterator[str]:
+        yield self.to_html()
@@ -0,0 +1,70 @@
+from pathlib import Path
+import posixpath
+from typing import Dict, Iterable, List, Set, Tuple
+from urllib.parse import unquote, urlsplit
+
+
+def site_path(root: Path, path: Path) -> str:
+    return "/" + path.relative_to(root).as_posix()
+
+
+class LinkChecker:
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        # Every url path the finished site serves a file for
+        self.targets: Set[str] = set()
+        self.pages: Set[str] = set()
+        self.broken: Dict[str, List[str]] = {}
+        self.checked = 0
+
+    def add_targets(self, paths: Iterable[Path]) -> None:
+        self.targets.update(site_path(self.root, path) for path in paths)
+
+    def add_directory(self, source: Path) -> None:
+        # Static files end up at the same relative path below root
+        self.targets.update(
+            "/" + path.relative_to(source).as_posix()
+            for path in source.rglob("*")
+            if path.is_file()
+        )
+
+    def resolve(self, page: str, url: str) -> str | None:
+        parts = urlsplit(url)
+        if parts.scheme or parts.netloc or not parts.path:
+            # External, mailto: or a fragment of the page itself
+            return None
+        path = unquote(parts.path)
+        if not path.startswith("/"):
+            path = posixpath.join(posixpath.dirname(page), path)
+        resolved = posixpath.normpath(path)
+        if path.endswith("/") and resolved != "/":
+            resolved += "/"
+        return resolved
+
+    def exists(self, path: str) -> bool:
+        if path in self.targets:
+            return True
+        # Directories are served through their index page
+        return path.rstrip("/") + "/index.html" in self.targets
+
+    def check(self, dest: Path, urls: Iterable[str]) -> List[str]:
+        page = site_path(self.root, dest)
+        self.pages.add(page)
+        broken = []
+        for url in urls:
+            path = self.resolve(page, url)
+            if path is None:
+                continue
+            self.checked += 1
+            if not self.exists(path):
+                broken.append(url)
+        if broken:
+            self.broken[page] = broken
+        else:
+            self.broken.pop(page, None)
+        return broken
+
+    def report(self) -> List[Tuple[str, str]]:
+        return [
+            (page, url) for page in sorted(self.broken) for url in self.broken[page]
+        ]
@@ -1,29 +1,434 @@
+import argparse
 import os
 from pathlib import Path
 import shutil
 
-from document import generate_pages_recursively
+from block import set_block_cache
+from assets import AssetMap
+from blockcache import BlockCache
+from compress import CODECS, Compressor
+from document import (
+    generate_pages_recursively,
+    set_compressor,
+    set_link_checker,
+    set_minify_pages,
+    set_parse_cache,
+    set_search_index,
+)
+from inline import INLINE_PARSERS, set_image_resolver, set_inline_parser
+from links import LinkChecker, site_path
+from manifest import Manifest
+from minify import AssetMinifier
+from parsecache import ParseCache
+from profiler import PROFILER
+from search import SearchIndex
+from staging import StagedOutput
+from sync import sync_directory
+from template import set_asset_urls
+from watch import SiteRebuilder, watch_site
 
 
-def main():
-    # Assumes file is '.../src/main.py' and gets to base directory '.../'
-    root = Path(__file__).parent.parent
-    recursive_copy(root / "static", root / "public")
-    generate_pages_recursively(
-        root / "content",
-        root / "template.html",
-        root / "public",
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build the static site")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only regenerate pages whose source or template changed",
     )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="build, serve public/ and rebuild changed files with live reload",
+    )
+    parser.add_argument(
+        "--port", type=int, default=8888, help="port of the --watch dev server"
+    )
+    parser.add_argument(
+        "--atomic",
+        action="store_true",
+        help="build into a staging copy of public/ and swap it in when done",
+    )
+    parser.add_argument(
+        "--compress",
+        nargs="?",
+        const="gz",
+        metavar="CODECS",
+        help="write precompressed siblings of html, css and other text outputs, "
+        f"a comma separated list of {', '.join(CODECS)} (default gz)",
+    )
+    parser.add_argument(
+        "--search",
+        action="store_true",
+        help="write a sharded full-text search index to public/search",
+    )
+    parser.add_argument(
+        "--check-links",
+        action="store_true",
+        help="report internal links and images that point at nothing in the site",
+    )
+    parser.add_argument(
+        "--strict-links",
+        action="store_true",
+        help="like --check-links, but fail the build on broken links",
+    )
+    parser.add_argument(
+        "--fingerprint",
+        action="store_true",
+        help="copy images, css and other assets to content-hashed names, point "
+        "templates and <img> at them and give <img> their size (not with --watch)",
+    )
+    parser.add_argument(
+        "--minify",
+        action="store_true",
+        help="collapse whitespace in pages and minify css and html static files, "
+        "keeping minified copies in .cache/ by source hash",
+    )
+    parser.add_argument(
+        "--hash-assets",
+        action="store_true",
+        help="compare static files by content hash, not only size and mtime "
+        "(needs --incremental, --atomic or --watch)",
+    )
+    parser.add_argument(
+        "--link-assets",
+        action="store_true",
+        help="hard link static files into public/ where the filesystem allows "
+        "(needs --incremental, --atomic or --watch)",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of worker processes rendering pages (0 uses every core)",
+    )
+    parser.add_argument(
+        "--pipeline",
+        nargs="?",
+        type=int,
+        default=0,
+        const=16,
+        metavar="DEPTH",
+        help="overlap reading, parsing and writing, keeping up to DEPTH pages "
+        "queued per stage (used when --jobs is 1)",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        type=Path,
+        const=Path("profile.json"),
+        help="time every build stage and write a json and chrome trace report",
+    )
+    parser.add_argument(
+        "--block-cache",
+        type=int,
+        default=0,
+        metavar="ENTRIES",
+        help="reuse the rendered html of identical blocks, keeping up to ENTRIES",
+    )
+    parser.add_argument(
+        "--persist-block-cache",
+        action="store_true",
+        help="keep the block cache in .cache/ between builds",
+    )
+    parser.add_argument(
+        "--parse-cache",
+        action="store_true",
+        help="cache parsed content and titles in .cache/ by source hash",
+    )
+    parser.add_argument(
+        "--parse-cache-size",
+        type=int,
+        default=256,
+        metavar="MB",
+        help="size limit of the parse cache, least recently used entries go first",
+    )
+    parser.add_argument(
+        "--inline-parser",
+        choices=INLINE_PARSERS,
+        default="scan",
+        help="inline markdown parser, 'split' is the original six-pass pipeline",
+    )
+    args = parser.parse_args(argv)
+    if args.compress:
+        unknown = set(args.compress.split(",")) - set(CODECS)
+        if unknown:
+            parser.error(f"unknown compression codecs: {', '.join(sorted(unknown))}")
+    if (args.hash_assets or args.link_assets) and not (
+        args.incremental or args.atomic or args.watch
+    ):
+        # A full build copies static/ from scratch, there is nothing to compare
+        parser.error(
+            "--hash-assets and --link-assets need --incremental, --atomic or --watch"
+        )
+    return args
+
+
+# Assumes file is '.../src/main.py' and gets to base directory '.../'
+ROOT = Path(__file__).parent.parent
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.watch:
+        watch(args)
+        return
+    build(args)
+
+
+def watch(args: argparse.Namespace | None = None):
+    args = args or parse_args()
+    args.incremental = True
+    if args.fingerprint:
+        # Edits to static files are synced under their own name, templates
+        # would keep pointing at the old fingerprint
+        print("Ignoring --fingerprint in watch mode")
+        args.fingerprint = False
+    manifest = build(args)
+    rebuilder = SiteRebuilder(
+        ROOT / "content",
+        ROOT / "static",
+        ROOT / "template.html",
+        ROOT / "public",
+        manifest,
+        AssetMinifier(ROOT / ".cache" / "minified") if args.minify else None,
+    )
+    watch_site(rebuilder, args.port)
+
+
+def build(args: argparse.Namespace) -> Manifest | None:
+    set_inline_parser(args.inline_parser)
+    workers = args.jobs or os.cpu_count() or 1
+    if args.profile is not None:
+        PROFILER.enable()
+        # Stages are only recorded in this process, one page at a time
+        workers = 1
+        args.pipeline = 0
+    root = ROOT
+    cache = None
+    if args.block_cache > 0:
+        cache_path = root / ".cache" / "blocks.json"
+        cache = BlockCache(
+            args.block_cache, cache_path if args.persist_block_cache else None
+        )
+        cache.load()
+        set_block_cache(cache)
+
+    parse_cache = None
+    if args.parse_cache:
+        parse_cache = ParseCache(
+            root / ".cache" / "pages", args.parse_cache_size * 1024 * 1024
+        )
+        set_parse_cache(parse_cache)
+
+    public = root / "public"
+    output = public
+    staged = None
+    if args.atomic:
+        staged = StagedOutput(public)
+        output = staged.prepare()
+
+    manifest = None
+    if args.incremental:
+        manifest = Manifest(root / ".cache" / "manifest.json")
+        manifest.load()
+        manifest.rebase(public, output)
+
+    compressor = None
+    if args.compress:
+        compressor = Compressor(
+            output, args.compress.split(","), root / ".cache" / "compressed.json"
+        )
+        compressor.load()
+        set_compressor(compressor)
+
+    search_index = None
+    if args.search:
+        search_index = SearchIndex(output, root / ".cache" / "search.json")
+        search_index.load()
+        set_search_index(search_index)
+
+    checker = None
+    if args.check_links or args.strict_links:
+        checker = LinkChecker(output)
+        checker.add_directory(root / "static")
+        set_link_checker(checker)
+
+    # Pages already written to public/ stay recorded, the build fails once its
+    # state is saved
+    failed = False
+    minifier = None
+    if args.minify:
+        minifier = AssetMinifier(root / ".cache" / "minified")
+        set_minify_pages(True)
+
+    assets = None
+    try:
+        if manifest is None and staged is None:
+            recursive_copy(root / "static", public, minifier)
+            if compressor is not None:
+                for path in public.rglob("*"):
+                    compressor.submit(path)
+        else:
+            copied, removed = sync_directory(
+                root / "static",
+                output,
+                manifest,
+                use_hash=args.hash_assets,
+                link=args.link_assets,
+                compressor=compressor,
+                minifier=minifier,
+            )
+            print(f"Synced static files: {len(copied)} copied, {len(removed)} removed")
+
+        if args.fingerprint:
+            assets = AssetMap(
+                root / "static",
+                output,
+                root / ".cache" / "assets.json",
+                minifier=minifier,
+            )
+            assets.load()
+            copied = assets.build()
+            removed = assets.remove_stale()
+            print(f"Fingerprinted assets: {len(copied)} new, {len(removed)} removed")
+            set_image_resolver(assets.image_props)
+            set_asset_urls(assets.urls)
+            if compressor is not None:
+                for path in assets.outputs():
+                    compressor.submit(path)
+            # Cached html embeds asset urls and sizes, so it is only valid for
+            # the same asset map
+            salt = assets.digest()
+            if cache is not None:
+                cache.salt = salt
+            if parse_cache is not None:
+                parse_cache.salt = salt
+            if manifest is not None:
+                manifest.invalidate_linking(assets.changed())
+
+        jobs = generate_pages_recursively(
+            root / "content",
+            root / "template.html",
+            output,
+            manifest,
+            workers,
+            args.pipeline,
+        )
+
+        if manifest is not None:
+            for removed in manifest.remove_stale():
+                if compressor is not None:
+                    compressor.remove(removed)
+                print(f"Removed stale page: {removed}")
+        if checker is not None:
+            set_link_checker(None)
+            if manifest is not None:
+                # Unchanged pages were not rendered, but what they link to may
+                # have been removed since
+                for entry in manifest.pages.values():
+                    dest = Path(entry["dest"])
+                    if site_path(output, dest) not in checker.pages:
+                        checker.check(dest, entry.get("links", []))
+            report_links(checker)
+            failed = args.strict_links and bool(checker.broken)
+            if failed and staged is not None:
+                # The live site is left as it was
+                print("Aborting: the site has broken links")
+                exit(1)
+        search_files = []
+        if search_index is not None:
+            set_search_index(None)
+            search_index.retain(str(job.from_path) for job in jobs)
+            search_files = search_index.write()
+            search_index.save()
+            if compressor is not None:
+                for path in search_files:
+                    compressor.submit(path)
+            print(f"Indexed {len(search_index.ids)} pages for search")
+        if minifier is not None:
+            minifier.prune()
+            print(f"Minified {minifier.minified} static files")
+        if compressor is not None:
+            for error in compressor.wait():
+                print(f"Could not compress output. Error:\n  {error}")
+            print(f"Compressed {compressor.compressed} files")
+        if manifest is None and staged is not None:
+            # The staging copy starts from the live site, drop what this build
+            # did not produce
+            static = root / "static"
+            keep = [job.dest_path for job in jobs] + search_files
+            if assets is not None:
+                keep += assets.outputs()
+            keep += [
+                output / path.relative_to(static)
+                for path in static.rglob("*")
+                if path.is_file()
+            ]
+            if compressor is not None:
+                keep += [
+                    sibling for path in keep for sibling in compressor.outputs(path)
+                ]
+            for removed in staged.prune(keep):
+                print(f"Removed stale file: {removed.relative_to(output)}")
+    except BaseException:
+        if staged is not None:
+            staged.abort()
+        raise
+    finally:
+        if compressor is not None:
+            set_compressor(None)
+            compressor.close()
+
+    if staged is not None:
+        staged.commit()
+        print(f"Swapped the new build into {public}")
+    if manifest is not None:
+        manifest.rebase(output, public)
+        manifest.save()
+    if assets is not None:
+        # Saved with the manifest, an aborted build must see the same changes
+        # again to invalidate the pages linking them
+        assets.save()
+    if parse_cache is not None:
+        parse_cache.prune()
+        print(f"Parse cache: {parse_cache.stats()}")
+    if cache is not None:
+        print(f"Block cache: {cache.stats()}")
+        cache.save()
+    if args.profile is not None:
+        PROFILER.write_report(args.profile)
+        print(f"Wrote profile to {args.profile}")
+    if failed:
+        print("Failing the build: the site has broken links")
+        exit(1)
+    return manifest
+
+
+def report_links(checker: LinkChecker) -> None:
+    broken = checker.report()
+    if not broken:
+        print(f"Checked {checker.checked} links, none broken")
+        return
+    print(
+        f"Broken links: {len(broken)} of {checker.checked} in {len(checker.broken)} pages"
+    )
+    for page, url in broken:
+        print(f"  {page}: {url}")
 
 
-def recursive_copy(source: Path, target: Path) -> None:
+def recursive_copy(
+    source: Path, target: Path, minifier: AssetMinifier | None = None
+) -> None:
     clear_directory(target)
 
     items = source.iterdir()
     for item in items:
         dest = target / item.name
         if item.is_dir():
-            recursive_copy(item, dest)
+            recursive_copy(item, dest, minifier)
+        elif minifier is not None and minifier.handles(item):
+            minifier.copy(item, dest)
         else:
             shutil.copy(item, dest)
 
@@ -0,0 +1,145 @@
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, Iterable, List, TextIO
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def file_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+PARSER_MODULES = (
+    "block.py",
+    "inline.py",
+    "textnode.py",
+    "htmlnode.py",
+    "leafnode.py",
+    "parentnode.py",
+)
+
+
+def parser_version() -> str:
+    # Any edit to the parser sources changes the version, invalidating caches
+    # of parsed output without anyone having to remember to bump a number
+    digest = hashlib.sha256()
+    for module in PARSER_MODULES:
+        digest.update(file_hash(Path(__file__).parent / module).encode())
+    return digest.hexdigest()[:16]
+
+
+class HashingWriter:
+    def __init__(self, fp: TextIO) -> None:
+        self.fp = fp
+        self.digest = hashlib.sha256()
+
+    def write(self, text: str) -> None:
+        self.fp.write(text)
+        self.digest.update(text.encode())
+
+    def hexdigest(self) -> str:
+        return self.digest.hexdigest()
+
+
+class Manifest:
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.pages: Dict[str, Dict[str, str]] = {}
+        self.assets: Dict[str, str] = {}
+        self.seen = set()
+
+    def load(self) -> None:
+        try:
+            with open(self.path) as manifest_file:
+                data = json.load(manifest_file)
+            self.pages = data["pages"]
+            self.assets = data.get("assets", {})
+        except (FileNotFoundError, json.JSONDecodeError, KeyError, TypeError):
+            self.pages = {}
+            self.assets = {}
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, mode="w") as manifest_file:
+            json.dump(
+                {"pages": self.pages, "assets": self.assets},
+                manifest_file,
+                indent=1,
+                sort_keys=True,
+            )
+
+    def touch(self, source: Path) -> None:
+        self.seen.add(str(source))
+
+    def is_fresh(
+        self, source: Path, dest: Path, source_hash: str, template_hash: str
+    ) -> bool:
+        entry = self.pages.get(str(source))
+        return (
+            entry is not None
+            and entry["dest"] == str(dest)
+            and entry["source"] == source_hash
+            and entry["template"] == template_hash
+            and dest.exists()
+        )
+
+    def record(
+        self,
+        source: Path,
+        dest: Path,
+        source_hash: str,
+        template_hash: str,
+        output_hash: str,
+        links: Iterable[str] = (),
+    ) -> None:
+        self.pages[str(source)] = {
+            "dest": str(dest),
+            "source": source_hash,
+            "template": template_hash,
+            "output": output_hash,
+            "links": list(links),
+        }
+
+    def rebase(self, old_root: Path, new_root: Path) -> None:
+        # Staged builds write below a different directory than the live site
+        for entry in self.pages.values():
+            dest = Path(entry["dest"])
+            if dest.is_relative_to(old_root):
+                entry["dest"] = str(new_root / dest.relative_to(old_root))
+
+    def invalidate_linking(self, urls: Iterable[str]) -> List[Path]:
+        # Pages embedding these urls are rebuilt even if their source is not
+        urls = set(urls)
+        invalidated = []
+        for source, entry in self.pages.items():
+            if urls.intersection(entry.get("links", ())):
+                entry["source"] = ""
+                invalidated.append(Path(source))
+        return invalidated
+
+    def forget(self, source: Path) -> Path | None:
+        entry = self.pages.pop(str(source), None)
+        if entry is None:
+            return None
+        dest = Path(entry["dest"])
+        try:
+            dest.unlink()
+        except FileNotFoundError:
+            return None
+        try:
+            dest.parent.rmdir()
+        except OSError:
+            pass
+        return dest
+
+    def remove_stale(self) -> List[Path]:
+        stale = [source for source in self.pages if source not in self.seen]
+        removed = (self.forget(Path(source)) for source in stale)
+        return [dest for dest in removed if dest is not None]
@@ -0,0 +1,269 @@
+import io
+import os
+from pathlib import Path
+import re
+import shutil
+import string
+import tempfile
+import threading
+from typing import Callable, Dict, Set, TextIO
+
+from manifest import file_hash
+from staging import replace_if_changed
+
+# Not unicode whitespace: a non-breaking space is content
+WHITESPACE = " \t\n\r\f"
+WHITESPACE_REGEX = re.compile(r"[ \t\n\r\f]+")
+TAG_REGEX = re.compile(r"<(/?)([A-Za-z][\w-]*)")
+# Whitespace next to these never renders, inside the others it is content
+BLOCK_TAGS = {
+    "address",
+    "article",
+    "aside",
+    "blockquote",
+    "body",
+    "br",
+    "dd",
+    "details",
+    "div",
+    "dl",
+    "dt",
+    "figcaption",
+    "figure",
+    "footer",
+    "form",
+    "h1",
+    "h2",
+    "h3",
+    "h4",
+    "h5",
+    "h6",
+    "head",
+    "header",
+    "hr",
+    "html",
+    "li",
+    "link",
+    "main",
+    "meta",
+    "nav",
+    "ol",
+    "p",
+    "pre",
+    "script",
+    "section",
+    "style",
+    "summary",
+    "table",
+    "tbody",
+    "td",
+    "tfoot",
+    "th",
+    "thead",
+    "title",
+    "tr",
+    "ul",
+}
+PRESERVE_TAGS = {"pre", "code", "textarea", "script", "style"}
+# Their content is not html, only the matching close tag ends them
+RAW_TAGS = {"script", "style"}
+RAW_END_LENGTH = max(len(f"</{name}>") for name in RAW_TAGS)
+# Anything else after a "<" is text, like "a < b", as leaf text is not escaped
+TAG_START = set(string.ascii_letters + "/!?")
+
+
+class HtmlMinifier:
+    # Sits between the template and the output file. Only an unfinished tag is
+    # held back between writes, never the page.
+    def __init__(self, fp: TextIO) -> None:
+        self.fp = fp
+        self.buffer = ""
+        # Open <pre>, <code>... elements, whose whitespace is written as is
+        self.preserve = 0
+        # Close tag that ends the open <script> or <style>
+        self.raw_end: re.Pattern | None = None
+        self.space = False
+        self.after_block = True
+
+    def write(self, text: str) -> None:
+        self.buffer += text
+        self.feed()
+
+    def close(self) -> None:
+        self.feed(final=True)
+
+    def feed(self, final: bool = False) -> None:
+        text = self.buffer
+        pos = 0
+        while pos < len(text):
+            if self.raw_end is not None:
+                match = self.raw_end.search(text, pos)
+                if match is None:
+                    # Hold back what may be the start of the close tag
+                    end = len(text) if final else max(pos, len(text) - RAW_END_LENGTH)
+                    self.fp.write(text[pos:end])
+                    pos = end
+                    break
+                self.fp.write(text[pos : match.start()])
+                pos = match.start()
+                self.raw_end = None
+
+            if text[pos] == "<":
+                if pos + 1 == len(text) and not final:
+                    break
+                if text[pos + 1 : pos + 2] in TAG_START:
+                    close = "-->" if text.startswith("<!--", pos) else ">"
+                    end = text.find(close, pos)
+                    if end == -1:
+                        if not final:
+                            break
+                        end = len(text)
+                    else:
+                        end += len(close)
+                    self.tag(text[pos:end])
+                    pos = end
+                    continue
+            end = text.find("<", pos + 1)
+            if end == -1:
+                end = len(text)
+            self.text(text[pos:end])
+            pos = end
+        self.buffer = text[pos:]
+
+    def text(self, text: str) -> None:
+        if self.preserve:
+            self.fp.write(text)
+            return
+        body = text.strip(WHITESPACE)
+        if not body:
+            self.space = True
+            return
+        if (self.space or text[0] in WHITESPACE) and not self.after_block:
+            self.fp.write(" ")
+        self.fp.write(WHITESPACE_REGEX.sub(" ", body))
+        self.space = text[-1] in WHITESPACE
+        self.after_block = False
+
+    def tag(self, tag: str) -> None:
+        if tag.startswith("<!--"):
+            # Comments change nothing about the whitespace around them
+            self.fp.write(tag)
+            return
+        match = TAG_REGEX.match(tag)
+        # Anything else starting with "<", like a doctype, counts as a block
+        block = match is None or match.group(2).lower() in BLOCK_TAGS
+        if self.space and not (block or self.after_block):
+            self.fp.write(" ")
+        self.space = False
+        self.fp.write(tag)
+        self.after_block = block
+        name = match.group(2).lower() if match is not None else ""
+        if name in PRESERVE_TAGS:
+            if match.group(1):
+                self.preserve = max(self.preserve - 1, 0)
+            elif not tag.endswith("/>"):
+                self.preserve += 1
+                if name in RAW_TAGS:
+                    self.raw_end = re.compile(rf"</{name}(?=[\s/>])", re.IGNORECASE)
+
+
+def minify_html(html: str) -> str:
+    output = io.StringIO()
+    minifier = HtmlMinifier(output)
+    minifier.write(html)
+    minifier.close()
+    return output.getvalue()
+
+
+CSS_SKIP_REGEX = re.compile(
+    r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*'|/\*.*?\*/)""", re.DOTALL
+)
+# Not "+", calc() needs the spaces around it, nor before ":", which would turn
+# "a :hover" into "a:hover"
+CSS_PUNCTUATION_REGEX = re.compile(r" ?([{};,>]) ?|(:) ")
+
+
+def minify_css(css: str) -> str:
+    parts = []
+    code = ""
+    # Strings are copied as they are and comments become whitespace
+    for index, part in enumerate(CSS_SKIP_REGEX.split(css)):
+        if index % 2 == 0:
+            code += part
+        elif part.startswith("/*"):
+            code += " "
+        else:
+            parts.append(minify_css_code(code))
+            parts.append(part)
+            code = ""
+    parts.append(minify_css_code(code))
+    return "".join(parts).strip()
+
+
+def minify_css_code(code: str) -> str:
+    code = WHITESPACE_REGEX.sub(" ", code)
+    code = CSS_PUNCTUATION_REGEX.sub(lambda match: match.group(1) or ":", code)
+    return code.replace(";}", "}")
+
+
+MINIFIERS: Dict[str, Callable[[str], str]] = {
+    ".css": minify_css,
+    ".html": minify_html,
+}
+
+
+def minifier_version() -> str:
+    # As with parser_version(), any edit to the minifiers invalidates output
+    # minified before it
+    return file_hash(Path(__file__))[:16]
+
+
+class AssetMinifier:
+    def __init__(self, directory: Path) -> None:
+        # Minified copies named after the hash of their source, so a file is
+        # only ever minified once
+        self.directory = directory
+        self.version = minifier_version()
+        self.used: Set[Path] = set()
+        self.lock = threading.Lock()
+        self.minified = 0
+
+    def handles(self, path: Path) -> bool:
+        return path.suffix.lower() in MINIFIERS
+
+    def cached(self, source: Path, digest: str | None = None) -> Path:
+        digest = digest or file_hash(source)
+        suffix = source.suffix.lower()
+        cached = self.directory / f"{digest}-{self.version}{suffix}"
+        with self.lock:
+            self.used.add(cached)
+        if cached.exists():
+            return cached
+
+        text = MINIFIERS[suffix](source.read_text())
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Unique, two identical sources may be minified at the same time
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, mode="w") as tmp_file:
+            tmp_file.write(text)
+        os.replace(tmp, cached)
+        with self.lock:
+            self.minified += 1
+        return cached
+
+    def copy(self, source: Path, dest: Path, digest: str | None = None) -> bool:
+        cached = self.cached(source, digest)
+        tmp = dest.with_name(f".{dest.name}.tmp")
+        shutil.copyfile(cached, tmp)
+        return replace_if_changed(tmp, dest, file_hash(cached))
+
+    def prune(self) -> int:
+        # Minified copies of sources that no longer exist
+        removed = 0
+        if not self.directory.is_dir():
+            return removed
+        for path in self.directory.iterdir():
+            if path not in self.used:
+                path.unlink()
+                removed += 1
+        return removed
@@ -1,14 +1,24 @@
-from typing import Dict, List
+from typing import Dict, Iterator, List
 from htmlnode import HTMLNode
 
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(
         self, tag: str, children: List[HTMLNode], props: Dict[str, str] | None = None
     ) -> None:
-        super().__init__(tag, None, children, props)
+        self.tag = tag
+        self.value = None
+        self.children = children
+        self.props = props
 
     def to_html(self):
+        return "".join(self.iter_html())
+
+    def iter_html(self) -> Iterator[str]:
+        # Fragments are yielded as soon as they are known, so nesting depth no
+        # longer means copying every subtree's html once per enclosing level
         if not self.tag:
             raise ValueError("ParentNode should have a tag")
 
@@ -16,5 +26,7 @@ class ParentNode(HTMLNode):
             raise ValueError("ParentNode should have children")
 
         open, close = self.tag_to_html_tags()
-        children = "".join(child.to_html() for child in self.children)
-        return f"{open}{children}{close}"
+        yield open
+        for child in self.children:
+            yield from child.iter_html()
+        yield close
@@ -0,0 +1,71 @@
+import json
+import os
+from pathlib import Path
+import shutil
+from typing import Dict
+import zlib
+
+from manifest import parser_version, text_hash
+
+
+class ParseCache:
+    def __init__(self, directory: Path, max_bytes: int = 256 * 1024 * 1024) -> None:
+        self.root = directory
+        self.version = parser_version()
+        # Entries of older parser versions live in sibling directories and are
+        # dropped by prune(), so a parser change never serves stale html
+        self.directory = directory / self.version
+        self.max_bytes = max_bytes
+        # Mixed into every key when the html depends on more than the source
+        self.salt = ""
+        self.hits = 0
+        self.misses = 0
+
+    def entry_path(self, source_hash: str) -> Path:
+        if self.salt:
+            source_hash = text_hash(source_hash + self.salt)
+        return self.directory / source_hash[:2] / source_hash
+
+    def get(self, source_hash: str) -> Dict[str, str] | None:
+        path = self.entry_path(source_hash)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        # Refresh the mtime, eviction drops the least recently used entries
+        os.utime(path)
+        return json.loads(zlib.decompress(data))
+
+    def put(self, source_hash: str, values: Dict[str, str]) -> None:
+        path = self.entry_path(source_hash)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.tmp")
+        tmp.write_bytes(zlib.compress(json.dumps(values).encode()))
+        os.replace(tmp, path)
+
+    def prune(self) -> int:
+        removed = 0
+        if self.root.exists():
+            for directory in self.root.iterdir():
+                if directory != self.directory:
+                    shutil.rmtree(directory, ignore_errors=True)
+
+        entries = []
+        total = 0
+        for path in self.directory.glob("*/*"):
+            stat = path.stat()
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            path.unlink()
+            total -= size
+            removed += 1
+        return removed
+
+    def stats(self) -> str:
+        return f"{self.hits} hits, {self.misses} misses"
@@ -0,0 +1,134 @@
+import contextlib
+import json
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List
+
+NULL_STAGE = contextlib.nullcontext()
+
+
+class Stage:
+    def __init__(self, profiler: "Profiler", name: str) -> None:
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+        self.start_memory = 0
+        self.peak = 0
+
+    def __enter__(self) -> "Stage":
+        stack = self.profiler.stack
+        if stack:
+            # The enclosing stage keeps the peak it reached before this reset
+            stack[-1].peak = max(stack[-1].peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        self.start_memory = tracemalloc.get_traced_memory()[0]
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        end = time.perf_counter()
+        self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+        stack = self.profiler.stack
+        stack.pop()
+        if stack:
+            stack[-1].peak = max(stack[-1].peak, self.peak)
+        self.profiler.record(self, end, len(stack))
+
+
+class Profiler:
+    def __init__(self) -> None:
+        self.enabled = False
+        self.origin = 0.0
+        self.stack: List[Stage] = []
+        self.page_name = ""
+        self.pages: Dict[str, Dict[str, List[float]]] = {}
+        self.events: List[dict] = []
+
+    def enable(self) -> None:
+        self.enabled = True
+        self.origin = time.perf_counter()
+        tracemalloc.start()
+
+    def stage(self, name: str):
+        if not self.enabled:
+            return NULL_STAGE
+        return Stage(self, name)
+
+    @contextlib.contextmanager
+    def page(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        self.page_name = name
+        self.pages[name] = {}
+        with self.stage("page"):
+            yield
+        self.page_name = ""
+
+    def record(self, stage: Stage, end: float, depth: int) -> None:
+        seconds = end - stage.start
+        peak = stage.peak - stage.start_memory
+        stages = self.pages.setdefault(self.page_name, {})
+        total = stages.setdefault(stage.name, [0.0, 0, 0])
+        total[0] += seconds
+        total[1] = max(total[1], peak)
+        total[2] += 1
+        # Block level stages run thousands of times per page, the trace only
+        # gets the page and the stages directly inside it
+        if depth <= 1:
+            self.events.append(
+                {
+                    "name": stage.name,
+                    "cat": "page" if depth == 0 else "stage",
+                    "ph": "X",
+                    "ts": (stage.start - self.origin) * 1e6,
+                    "dur": seconds * 1e6,
+                    "pid": 0,
+                    "tid": 0,
+                    "args": {"page": self.page_name, "peak_bytes": peak},
+                }
+            )
+
+    def report(self, top: int = 20) -> dict:
+        totals: Dict[str, Dict[str, float]] = {}
+        pages = []
+        for name, stages in self.pages.items():
+            if not name:
+                continue
+            for stage, (seconds, peak, calls) in stages.items():
+                total = totals.setdefault(
+                    stage, {"seconds": 0.0, "peak_bytes": 0, "calls": 0}
+                )
+                total["seconds"] += seconds
+                total["peak_bytes"] = max(total["peak_bytes"], peak)
+                total["calls"] += calls
+            pages.append(
+                {
+                    "page": name,
+                    "seconds": stages.get("page", [0.0])[0],
+                    "stages": {
+                        stage: {"seconds": seconds, "peak_bytes": peak}
+                        for stage, (seconds, peak, _) in stages.items()
+                        if stage != "page"
+                    },
+                }
+            )
+        pages.sort(key=lambda page: page["seconds"], reverse=True)
+        stages = sorted(totals.items(), key=lambda item: item[1]["seconds"])
+        return {
+            "pages": len(pages),
+            "stages": dict(reversed(stages)),
+            "slowest_pages": pages[:top],
+        }
+
+    def write_report(self, path: Path) -> None:
+        with open(path, mode="w") as report_file:
+            json.dump(self.report(), report_file, indent=1)
+        trace_path = path.with_suffix(".trace.json")
+        with open(trace_path, mode="w") as trace_file:
+            json.dump({"traceEvents": self.events}, trace_file)
+
+
+PROFILER = Profiler()
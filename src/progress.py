@@ -0,0 +1,52 @@
+import sys
+import threading
+import time
+
+
+class Progress:
+    def __init__(self, total: int, label: str = "Generated", interval: float = 0.2):
+        self.total = total
+        self.label = label
+        self.interval = interval
+        self.done = 0
+        self.failed = 0
+        self.last = 0.0
+        self.live = sys.stdout.isatty()
+        # A pipelined build advances from the main and the writer thread
+        self.lock = threading.Lock()
+
+    def advance(self, count: int = 1) -> None:
+        with self.lock:
+            self.done += count
+            now = time.monotonic()
+            if self.live and now - self.last >= self.interval:
+                self.last = now
+                print(
+                    f"\r{self.label} {self.done}/{self.total} pages", end="", flush=True
+                )
+
+    def log(self, message: str) -> None:
+        with self.lock:
+            if self.live:
+                print("\r\033[K", end="")
+            print(message)
+
+    def fail(self, message: str) -> None:
+        # The page still counts as done, but not as generated
+        with self.lock:
+            self.failed += 1
+        self.log(message)
+
+    def finish(self, skipped: int = 0) -> None:
+        if self.live:
+            print("\r\033[K", end="")
+        generated = self.done - skipped - self.failed
+        summary = f"{self.label} {generated}/{self.total} pages"
+        notes = []
+        if skipped:
+            notes.append(f"{skipped} unchanged")
+        if self.failed:
+            notes.append(f"{self.failed} failed")
+        if notes:
+            summary += f" ({', '.join(notes)})"
+        print(summary)
@@ -0,0 +1,140 @@
+import json
+import os
+from pathlib import Path
+import re
+from typing import Dict, Iterable, List
+
+from manifest import text_hash
+from staging import replace_if_changed
+
+TERM_REGEX = re.compile(r"\w+")
+INDEX_VERSION = 2
+
+
+def tokenize(text: str) -> List[str]:
+    return [term.lower() for term in TERM_REGEX.findall(text)]
+
+
+def postings(text: str) -> Dict[str, List[int]]:
+    positions: Dict[str, List[int]] = {}
+    for position, term in enumerate(tokenize(text)):
+        positions.setdefault(term, []).append(position)
+    return positions
+
+
+class SearchIndex:
+    def __init__(
+        self, root: Path, state_path: Path | None = None, prefix_length: int = 2
+    ) -> None:
+        self.root = root
+        self.directory = root / "search"
+        self.state_path = state_path
+        self.prefix_length = prefix_length
+        # Pages keep their id across builds, so an edit only rewrites the
+        # shards holding that page's terms
+        self.ids: Dict[str, int] = {}
+        self.free: List[int] = []
+        self.pages: Dict[str, Dict] = {}
+
+    def load(self) -> None:
+        if self.state_path is None:
+            return
+        try:
+            with open(self.state_path) as state_file:
+                data = json.load(state_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        if data.get("version") != INDEX_VERSION:
+            return
+        self.ids = data["ids"]
+        self.pages = data["pages"]
+        used = set(self.ids.values())
+        self.free = [i for i in range(max(used, default=-1), -1, -1) if i not in used]
+
+    def save(self) -> None:
+        if self.state_path is None:
+            return
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.state_path, mode="w") as state_file:
+            json.dump(
+                {"version": INDEX_VERSION, "ids": self.ids, "pages": self.pages},
+                state_file,
+                separators=(",", ":"),
+            )
+
+    def add(
+        self, source: str, dest: Path, title: str, text: str, source_hash: str = ""
+    ) -> None:
+        if source not in self.ids:
+            # Reuse the ids of removed pages before growing the page list
+            self.ids[source] = self.free.pop() if self.free else len(self.ids)
+        self.pages[source] = {
+            "url": "/" + dest.relative_to(self.root).as_posix(),
+            "title": title,
+            "source": source_hash,
+            "postings": postings(text),
+        }
+
+    def is_current(self, source: str, source_hash: str) -> bool:
+        # Pages rendered while the index was off still hold their old text
+        page = self.pages.get(source)
+        return page is not None and page.get("source") == source_hash
+
+    def retain(self, sources: Iterable[str]) -> None:
+        keep = set(sources)
+        for source in [source for source in self.ids if source not in keep]:
+            self.free.append(self.ids.pop(source))
+            self.pages.pop(source, None)
+        self.free.sort(reverse=True)
+
+    def shards(self) -> Dict[str, Dict[str, List[List[int]]]]:
+        # term -> [[page id, first position, gaps to the following ones...]]
+        shards: Dict[str, Dict[str, List[List[int]]]] = {}
+        for source, page_id in sorted(self.ids.items(), key=lambda item: item[1]):
+            page = self.pages.get(source)
+            if page is None:
+                continue
+            for term, positions in page["postings"].items():
+                deltas = [positions[0]] + [
+                    position - previous
+                    for previous, position in zip(positions, positions[1:])
+                ]
+                shard = shards.setdefault(term[: self.prefix_length], {})
+                shard.setdefault(term, []).append([page_id] + deltas)
+        return shards
+
+    def write(self) -> List[Path]:
+        shards = self.shards()
+        page_list = [None] * (max(self.ids.values(), default=-1) + 1)
+        for source, page_id in self.ids.items():
+            page = self.pages.get(source)
+            if page is not None:
+                page_list[page_id] = [page["url"], page["title"]]
+
+        files = {
+            "meta.json": {
+                "version": INDEX_VERSION,
+                "prefix": self.prefix_length,
+                "shards": sorted(shards),
+            },
+            "pages.json": page_list,
+        }
+        for prefix, terms in shards.items():
+            files[f"shards/{prefix}.json"] = dict(sorted(terms.items()))
+
+        written = []
+        (self.directory / "shards").mkdir(parents=True, exist_ok=True)
+        for name, data in files.items():
+            path = self.directory / name
+            text = json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+            tmp = path.with_name(f".{path.name}.tmp")
+            tmp.write_text(text)
+            replace_if_changed(tmp, path, text_hash(text))
+            written.append(path)
+
+        # Shards whose prefix no longer occurs anywhere, with their siblings
+        for path in (self.directory / "shards").iterdir():
+            shard = path.with_name(path.name.split(".json")[0] + ".json")
+            if shard not in written:
+                os.unlink(path)
+        return written
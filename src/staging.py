@@ -0,0 +1,105 @@
+import ctypes
+import errno
+import os
+from pathlib import Path
+import shutil
+from typing import Iterable, List
+
+from manifest import file_hash
+
+AT_FDCWD = -100
+RENAME_EXCHANGE = 2
+
+
+def replace_if_changed(tmp: Path, dest: Path, digest: str) -> bool:
+    # Identical output leaves dest alone, so its mtime and inode only change
+    # when its bytes do and rsync or a CDN only see real changes
+    try:
+        unchanged = dest.stat().st_size == tmp.stat().st_size and (
+            file_hash(dest) == digest
+        )
+    except FileNotFoundError:
+        unchanged = False
+    if unchanged:
+        tmp.unlink()
+        return False
+    os.replace(tmp, dest)
+    return True
+
+
+def clone_tree(source: Path, target: Path) -> None:
+    # Hard links make the copy nearly free. Every writer replaces files through
+    # a temporary sibling, so writing to the clone never touches the original.
+    target.mkdir()
+    for item in source.iterdir():
+        dest = target / item.name
+        if item.is_dir() and not item.is_symlink():
+            clone_tree(item, dest)
+            shutil.copystat(item, dest)
+            continue
+        try:
+            os.link(item, dest, follow_symlinks=False)
+        except OSError:
+            shutil.copy2(item, dest, follow_symlinks=False)
+
+
+def exchange_directories(a: Path, b: Path) -> bool:
+    # renameat2(RENAME_EXCHANGE) swaps both names in one atomic step on Linux
+    try:
+        renameat2 = ctypes.CDLL(None, use_errno=True).renameat2
+    except (AttributeError, OSError, TypeError):
+        return False
+    result = renameat2(
+        AT_FDCWD, os.fsencode(a), AT_FDCWD, os.fsencode(b), RENAME_EXCHANGE
+    )
+    if result == 0:
+        return True
+    error = ctypes.get_errno()
+    if error in (errno.ENOSYS, errno.EINVAL, errno.ENOTSUP):
+        return False
+    raise OSError(error, os.strerror(error), str(a))
+
+
+class StagedOutput:
+    def __init__(self, live: Path) -> None:
+        self.live = live
+        self.staging = live.with_name(f".{live.name}.staging")
+
+    def prepare(self) -> Path:
+        # Leftovers of an interrupted build are not trusted
+        shutil.rmtree(self.staging, ignore_errors=True)
+        if self.live.is_dir():
+            clone_tree(self.live, self.staging)
+        else:
+            self.staging.mkdir(parents=True)
+        return self.staging
+
+    def prune(self, keep: Iterable[Path]) -> List[Path]:
+        keep = {Path(path) for path in keep}
+        removed = []
+        for dirpath, dirnames, filenames in os.walk(self.staging, topdown=False):
+            directory = Path(dirpath)
+            for filename in filenames:
+                path = directory / filename
+                if path not in keep:
+                    path.unlink()
+                    removed.append(path)
+            if directory != self.staging and not any(directory.iterdir()):
+                directory.rmdir()
+        return removed
+
+    def commit(self) -> None:
+        if not self.live.exists():
+            os.rename(self.staging, self.live)
+            return
+        if not exchange_directories(self.staging, self.live):
+            # Not atomic, but the site is only missing between the two renames
+            old = self.live.with_name(f".{self.live.name}.old")
+            shutil.rmtree(old, ignore_errors=True)
+            os.rename(self.live, old)
+            os.rename(self.staging, self.live)
+            os.rename(old, self.staging)
+        shutil.rmtree(self.staging)
+
+    def abort(self) -> None:
+        shutil.rmtree(self.staging, ignore_errors=True)
@@ -0,0 +1,139 @@
+from concurrent.futures import ThreadPoolExecutor
+import os
+from pathlib import Path
+import shutil
+from typing import Dict, List, Tuple
+
+from compress import Compressor
+from manifest import Manifest, file_hash
+from minify import AssetMinifier
+
+
+def fast_copy(source: Path, dest: Path, link: bool = False) -> None:
+    # Copies into a temporary sibling and renames it over dest, so readers never
+    # see a half written file and an existing dest inode is never modified
+    tmp = dest.with_name(f".{dest.name}.tmp")
+    if link:
+        try:
+            os.link(source, tmp)
+            os.replace(tmp, dest)
+            return
+        except OSError:
+            pass
+
+    with open(source, "rb") as source_file, open(tmp, "wb") as tmp_file:
+        copied = False
+        if hasattr(os, "copy_file_range"):
+            try:
+                size = os.fstat(source_file.fileno()).st_size
+                while size > 0:
+                    sent = os.copy_file_range(
+                        source_file.fileno(), tmp_file.fileno(), size
+                    )
+                    if sent == 0:
+                        break
+                    size -= sent
+                copied = size == 0
+            except OSError:
+                tmp_file.seek(0)
+                tmp_file.truncate()
+        if not copied:
+            shutil.copyfileobj(source_file, tmp_file)
+    shutil.copystat(source, tmp)
+    os.replace(tmp, dest)
+
+
+def is_unchanged(
+    source: Path, dest: Path, source_hash: str | None, recorded_hash: str | None
+) -> bool:
+    try:
+        dest_stat = dest.stat()
+    except FileNotFoundError:
+        return False
+    source_stat = source.stat()
+    if source_stat.st_size != dest_stat.st_size:
+        return False
+    if source_hash is None:
+        return source_stat.st_mtime_ns == dest_stat.st_mtime_ns
+
+    if source_hash != (recorded_hash or file_hash(dest)):
+        return False
+    if source_stat.st_mtime_ns != dest_stat.st_mtime_ns and dest_stat.st_nlink == 1:
+        # Same bytes, only the mtime moved: align it so the next size/mtime
+        # comparison succeeds without hashing. A hard linked dest may be the
+        # live copy of a staged build, which must not change in place.
+        shutil.copystat(source, dest)
+    return True
+
+
+def collect_files(source: Path, target: Path) -> List[Tuple[Path, Path]]:
+    files = []
+    for item in source.iterdir():
+        dest = target / item.name
+        if item.is_dir():
+            dest.mkdir(exist_ok=True)
+            files.extend(collect_files(item, dest))
+        else:
+            files.append((item, dest))
+    return files
+
+
+def sync_directory(
+    source: Path,
+    target: Path,
+    manifest: Manifest | None = None,
+    use_hash: bool = False,
+    link: bool = False,
+    workers: int = 8,
+    compressor: Compressor | None = None,
+    minifier: AssetMinifier | None = None,
+) -> Tuple[List[Path], List[Path]]:
+    target.mkdir(exist_ok=True)
+    files = collect_files(source, target)
+    previous = manifest.assets if manifest is not None else {}
+    synced: Dict[str, str] = {}
+
+    def sync_file(item: Tuple[Path, Path]) -> Path | None:
+        source_file, dest = item
+        key = str(dest.relative_to(target))
+        source_hash = file_hash(source_file) if use_hash else None
+        synced[key] = source_hash or ""
+        # Hash of what ends up in dest, if known without reading it
+        written_hash = source_hash
+        if minifier is not None and minifier.handles(source_file):
+            # Never the size of its source, so only its content tells
+            copy = minifier.copy(source_file, dest, source_hash)
+            written_hash = None
+        else:
+            copy = not is_unchanged(source_file, dest, source_hash, previous.get(key))
+            if copy:
+                fast_copy(source_file, dest, link)
+        if compressor is not None:
+            # Unchanged files are offered too, their siblings may be missing
+            compressor.submit(dest, written_hash)
+        return dest if copy else None
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        copied = [dest for dest in pool.map(sync_file, files) if dest is not None]
+
+    removed = []
+    for key in sorted(set(previous) - set(synced)):
+        stale = target / key
+        try:
+            stale.unlink()
+        except FileNotFoundError:
+            continue
+        removed.append(stale)
+        if compressor is not None:
+            compressor.remove(stale)
+        for parent in list(stale.relative_to(target).parents)[:-1]:
+            try:
+                (target / parent).rmdir()
+            except FileNotFoundError:
+                continue
+            except OSError:
+                break
+
+    if manifest is not None:
+        manifest.assets = synced
+    return copied, removed
@@ -0,0 +1,173 @@
+import json
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Self, Set, TextIO
+
+from htmlnode import HTMLNode
+from manifest import text_hash
+
+SLOT_REGEX = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+EXTENDS_REGEX = re.compile(r'\s*\{\{\s*extends\s+"([^"]+)"\s*\}\}[ \t]*\n?')
+
+# Root-relative urls in href and src attributes of the template markup
+ASSET_REF_REGEX = re.compile(r"""((?:href|src)\s*=\s*["'])(/[^"'?#]+)""")
+
+DIRECTORY_TEMPLATE = "_template.html"
+PAGE_TEMPLATE_SUFFIX = ".template.html"
+
+
+class Template:
+    def __init__(self, source: str, path: Path | None = None) -> None:
+        self.path = path
+        self.digest = text_hash(source)
+        # Templates this one was built from, itself first and then its parents
+        self.chain: List[Path] = [path] if path is not None else []
+        self.parent: str | None = None
+        self.fragments: List[str] = []
+        self.slots: List[str] = []
+        self.raw_slots: List[str] = []
+
+        extends = EXTENDS_REGEX.match(source)
+        if extends:
+            self.parent = extends.group(1)
+            source = source[extends.end() :]
+
+        position = 0
+        for match in SLOT_REGEX.finditer(source):
+            self.fragments.append(source[position : match.start()])
+            self.slots.append(match.group(1))
+            self.raw_slots.append(match.group(0))
+            position = match.end()
+        self.fragments.append(source[position:])
+
+    @classmethod
+    def from_file(cls, path: Path) -> Self:
+        with open(path) as template_file:
+            return cls(template_file.read(), path)
+
+    def inside(self, parent: "Template", slot: str = "Content") -> "Template":
+        # Flattens this template into the given slot of its parent, so a page
+        # using a layout chain still renders in a single pass
+        template = Template("", self.path)
+        template.chain = self.chain + parent.chain
+        template.digest = text_hash(self.digest + parent.digest)
+        template.fragments = [parent.fragments[0]]
+        for i, (name, raw) in enumerate(zip(parent.slots, parent.raw_slots)):
+            following = parent.fragments[i + 1]
+            if name != slot:
+                template.slots.append(name)
+                template.raw_slots.append(raw)
+                template.fragments.append(following)
+                continue
+            template.fragments[-1] += self.fragments[0]
+            template.slots.extend(self.slots)
+            template.raw_slots.extend(self.raw_slots)
+            template.fragments.extend(self.fragments[1:])
+            template.fragments[-1] += following
+        return template
+
+    def with_asset_urls(self, urls: Dict[str, str]) -> "Template":
+        # Points asset references at their fingerprinted copies. The digest
+        # covers the urls used, so pages rebuild when one of them changes.
+        used = {}
+
+        def replace(match: re.Match) -> str:
+            url = match.group(2)
+            if url not in urls:
+                return match.group(0)
+            used[url] = urls[url]
+            return match.group(1) + urls[url]
+
+        fragments = [
+            ASSET_REF_REGEX.sub(replace, fragment) for fragment in self.fragments
+        ]
+        if not used:
+            return self
+        template = Template("", self.path)
+        template.chain = self.chain
+        template.parent = self.parent
+        template.digest = text_hash(self.digest + json.dumps(used, sort_keys=True))
+        template.fragments = fragments
+        template.slots = self.slots
+        template.raw_slots = self.raw_slots
+        return template
+
+    def render(self, fp: TextIO, values: Dict[str, str | HTMLNode]) -> None:
+        # Unknown slots are written back untouched, like a plain str.replace would
+        for fragment, slot, raw in zip(self.fragments, self.slots, self.raw_slots):
+            fp.write(fragment)
+            value = values.get(slot, raw)
+            if isinstance(value, HTMLNode):
+                value.write_html(fp)
+            else:
+                fp.write(value)
+        fp.write(self.fragments[-1])
+
+
+def is_template_file(path: Path) -> bool:
+    return path.name == DIRECTORY_TEMPLATE or path.name.endswith(PAGE_TEMPLATE_SUFFIX)
+
+
+asset_urls: Dict[str, str] = {}
+
+
+def set_asset_urls(urls: Dict[str, str]) -> None:
+    global asset_urls
+    asset_urls = urls
+
+
+class TemplateLoader:
+    def __init__(self, default_path: Path, content_root: Path | None = None) -> None:
+        self.default_path = Path(os.path.abspath(default_path))
+        self.content_root = content_root
+        self.templates: Dict[Path, Template] = {}
+        self.directory_templates: Dict[Path, Path] = {}
+        # Dependency graph: template file -> pages whose layout chain uses it
+        self.dependents: Dict[Path, Set[Path]] = {}
+
+    def load(self, path: Path, loading: tuple = ()) -> Template:
+        path = Path(os.path.abspath(path))
+        if path in self.templates:
+            return self.templates[path]
+        if path in loading:
+            raise Exception(f"Template inheritance cycle: {path}")
+
+        template = Template.from_file(path)
+        if template.parent is not None:
+            parent = self.load(path.parent / template.parent, loading + (path,))
+            template = template.inside(parent)
+        if asset_urls:
+            # Once per compiled template, not once per page
+            template = template.with_asset_urls(asset_urls)
+        self.templates[path] = template
+        return template
+
+    def template_path_for(self, page: Path) -> Path:
+        page_template = page.with_name(page.stem + PAGE_TEMPLATE_SUFFIX)
+        if page_template.exists():
+            return page_template
+        return self.directory_template(page.parent)
+
+    def directory_template(self, directory: Path) -> Path:
+        if directory not in self.directory_templates:
+            candidate = directory / DIRECTORY_TEMPLATE
+            if candidate.exists():
+                found = candidate
+            elif self.content_root is None or directory == self.content_root:
+                found = self.default_path
+            elif directory.parent == directory:
+                found = self.default_path
+            else:
+                found = self.directory_template(directory.parent)
+            self.directory_templates[directory] = found
+        return self.directory_templates[directory]
+
+    def for_page(self, page: Path) -> Template:
+        template = self.load(self.template_path_for(page))
+        for path in template.chain:
+            self.dependents.setdefault(path, set()).add(page)
+        return template
+
+    def pages_using(self, template_path: Path) -> Set[Path]:
+        return self.dependents.get(Path(os.path.abspath(template_path)), set())
@@ -0,0 +1,150 @@
+import pickle
+import tempfile
+import unittest
+from pathlib import Path
+
+from parameterized import parameterized
+
+from assets import AssetMap, image_size
+from inline import set_image_resolver, text_node_to_html_node
+from minify import AssetMinifier
+from textnode import TextNode, TextType
+
+
+def png(width, height):
+    return (
+        b"\x89PNG\r\n\x1a\n\x00\x00\x00\x0dIHDR"
+        + width.to_bytes(4, "big")
+        + height.to_bytes(4, "big")
+        + b"\x08\x02\x00\x00\x00"
+    )
+
+
+def jpeg(width, height):
+    app0 = b"\xff\xe0\x00\x10JFIF\x00" + b"\x00" * 9
+    sof0 = (
+        b"\xff\xc0\x00\x11\x08" + height.to_bytes(2, "big") + width.to_bytes(2, "big")
+    )
+    return b"\xff\xd8" + app0 + sof0 + b"\x03" + b"\x00" * 9
+
+
+def webp(chunk, body):
+    return b"RIFF\x00\x00\x00\x00WEBP" + chunk + b"\x00\x00\x00\x00" + body
+
+
+class TestImageSize(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "image"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    @parameterized.expand(
+        (
+            ("png", png(640, 480)),
+            (
+                "gif",
+                b"GIF89a" + (640).to_bytes(2, "little") + (480).to_bytes(2, "little"),
+            ),
+            ("jpeg", jpeg(640, 480)),
+            (
+                "lossy webp",
+                webp(b"VP8 ", b"\x00\x00\x00\x9d\x01\x2a\x80\x02\xe0\x01"),
+            ),
+            (
+                "lossless webp",
+                webp(b"VP8L", b"\x2f" + ((639) | (479 << 14)).to_bytes(4, "little")),
+            ),
+            (
+                "extended webp",
+                webp(
+                    b"VP8X",
+                    b"\x00" * 4
+                    + (639).to_bytes(3, "little")
+                    + (479).to_bytes(3, "little"),
+                ),
+            ),
+        )
+    )
+    def test_reads_dimensions_of_(self, name, data):
+        self.path.write_bytes(data)
+        self.assertEqual(image_size(self.path), (640, 480))
+
+    def test_unknown_format(self):
+        self.path.write_bytes(b"not an image at all, just some text")
+        self.assertIsNone(image_size(self.path))
+
+    def test_truncated_jpeg(self):
+        self.path.write_bytes(jpeg(640, 480)[:24])
+        self.assertIsNone(image_size(self.path))
+
+
+class TestAssetMap(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        self.static = root / "static"
+        self.public = root / "public"
+        (self.static / "images").mkdir(parents=True)
+        self.image = self.static / "images" / "logo.png"
+        self.image.write_bytes(png(32, 16))
+        (self.static / "index.css").write_text("body {}")
+        self.state = root / "assets.json"
+
+    def tearDown(self):
+        set_image_resolver(None)
+        self.tmp.cleanup()
+
+    def build(self):
+        assets = AssetMap(self.static, self.public, self.state)
+        assets.load()
+        assets.build()
+        assets.remove_stale()
+        assets.save()
+        return assets
+
+    def test_fingerprints_images_and_resolves_img_props(self):
+        assets = self.build()
+        url = assets.urls["/images/logo.png"]
+        self.assertRegex(url, r"^/images/logo\.[0-9a-f]{12}\.png$")
+        self.assertEqual((self.public / url[1:]).read_bytes(), self.image.read_bytes())
+        self.assertRegex(assets.urls["/index.css"], r"^/index\.[0-9a-f]{12}\.css$")
+
+        set_image_resolver(assets.image_props)
+        node = TextNode("logo", TextType.IMAGE, "/images/logo.png")
+        self.assertEqual(
+            text_node_to_html_node(node).to_html(),
+            f'<img src="{url}" alt="logo" width="32" height="16" loading="lazy"></img>',
+        )
+        node = TextNode("other", TextType.IMAGE, "https://example.com/x.png")
+        self.assertEqual(
+            text_node_to_html_node(node).to_html(),
+            '<img src="https://example.com/x.png" alt="other"></img>',
+        )
+
+    def test_changed_image_replaces_its_fingerprint(self):
+        first = self.build()
+        old = self.public / first.urls["/images/logo.png"][1:]
+        self.assertEqual(first.changed(), {"/images/logo.png", "/index.css"})
+
+        self.assertEqual(self.build().changed(), set())
+        self.image.write_bytes(png(64, 32))
+        assets = self.build()
+        self.assertEqual(assets.changed(), {"/images/logo.png"})
+        self.assertFalse(old.exists())
+        self.assertEqual(assets.image_props("/images/logo.png")["width"], "64")
+        self.assertNotEqual(assets.digest(), first.digest())
+
+    def test_resolver_can_be_sent_to_worker_processes(self):
+        assets = AssetMap(
+            self.static,
+            self.public,
+            minifier=AssetMinifier(self.public.parent / "minified"),
+        )
+        assets.build()
+        resolver = pickle.loads(pickle.dumps(assets.image_props))
+        self.assertEqual(
+            resolver("/images/logo.png"), assets.image_props("/images/logo.png")
+        )
+        self.assertIsNotNone(assets.minifier)
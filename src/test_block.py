@@ -1,5 +1,6 @@
 from parameterized import parameterized
 
+import io
 import unittest
 
 from block import (
@@ -7,7 +8,13 @@ from block import (
     markdown_to_blocks,
     block_to_block_type,
     markdown_to_html_node,
+    iter_blocks,
+    write_markdown_html,
+    Heading,
+    markdown_to_document,
+    set_block_cache,
 )
+from blockcache import BlockCache
 
 
 class TestMarkdownToBlocks(unittest.TestCase):
@@ -86,6 +93,16 @@ class TestBlockToBlockType(unittest.TestCase):
                 "This is some *very* random text",
                 BlockType.PARAGRAPH,
             ),
+            (
+                "ordered list with nested items",
+                "1. buy\n   * chicken\n   * sauce\n2. make dinner",
+                BlockType.ORDERED_LIST,
+            ),
+            (
+                "list mixing kinds at the top level",
+                "1. buy chicken\n* make dinner",
+                BlockType.PARAGRAPH,
+            ),
         )
     )
     def test_detects(self, name, input, expected_output):
@@ -210,3 +227,157 @@ This is a paragraph.
     def test_markdown_to_html_with_(self, name, markdown, expected_html):
         html_node = markdown_to_html_node(markdown)
         self.assertEqual(html_node.to_html(), expected_html)
+
+
+class TestNestedContainers(unittest.TestCase):
+    @parameterized.expand(
+        (
+            (
+                "nested lists",
+                "* a\n  * b\n    1. c\n    2. d\n* e",
+                "<div><ul><li>a<ul><li>b<ol><li>c</li><li>d</li></ol></li></ul></li>"
+                "<li>e</li></ul></div>",
+            ),
+            (
+                "dedent to a shallower item",
+                "1. a\n   - b\n     - c\n2. d",
+                "<div><ol><li>a<ul><li>b<ul><li>c</li></ul></li></ul></li>"
+                "<li>d</li></ol></div>",
+            ),
+            (
+                "nested quotes",
+                "> outer\n>> inner\n> outer again",
+                "<div><blockquote>outer<blockquote>inner</blockquote>"
+                "outer again</blockquote></div>",
+            ),
+            (
+                "list inside a quote",
+                "> intro\n> * one\n>   * two\n> outro",
+                "<div><blockquote>intro<ul><li>one<ul><li>two</li></ul></li></ul>"
+                "outro</blockquote></div>",
+            ),
+            (
+                "quote opened below a list",
+                "> * one\n>> deep",
+                "<div><blockquote><ul><li>one</li></ul>"
+                "<blockquote>deep</blockquote></blockquote></div>",
+            ),
+            (
+                "spaced quote markers",
+                "> outer\n> > inner\n> >  > deepest",
+                "<div><blockquote>outer<blockquote>inner"
+                "<blockquote>deepest</blockquote></blockquote></blockquote></div>",
+            ),
+            (
+                "empty nested quote",
+                "> a\n>>",
+                "<div><blockquote>a </blockquote></div>",
+            ),
+            (
+                "empty quote between lines",
+                "> a\n>> \n> b",
+                "<div><blockquote>a  b</blockquote></div>",
+            ),
+        )
+    )
+    def test_renders_(self, name, markdown, expected_html):
+        self.assertEqual(markdown_to_html_node(markdown).to_html(), expected_html)
+
+    def test_deep_nesting_keeps_every_item(self):
+        depth = 300
+        markdown = "\n".join(f"{'  ' * level}* item {level}" for level in range(depth))
+        html = markdown_to_html_node(markdown).to_html()
+        self.assertEqual(html.count("<ul>"), depth)
+        self.assertTrue(html.endswith("</li></ul>" * depth + "</div>"))
+
+
+class TestStreamingBlockParser(unittest.TestCase):
+    @parameterized.expand(
+        (
+            ("simple document", "# Title\n\nSome *text*\n\n* a\n* b"),
+            ("surrounding whitespace", "  \n\n\n  # Title  \n\n  text\n\n   \n"),
+            ("whitespace-only block", "a\n\n   \n\nb"),
+            ("blank line with spaces", "a\n   \nb"),
+            ("code", "```\ncode\n  indented\n```\n\n> quote\n> more"),
+        )
+    )
+    def test_matches_markdown_to_blocks_for_(self, name, markdown):
+        blocks = markdown_to_blocks(markdown)
+        expected = [(block_to_block_type(block), block) for block in blocks]
+        output = [
+            (block_type, "\n".join(lines))
+            for block_type, lines in iter_blocks(markdown.split("\n"))
+        ]
+        self.assertEqual(output, expected)
+
+    def test_reads_lines_from_a_file_handle(self):
+        markdown = "# Title\n\n1. one\n2. two\n\n```\nx = 1\n```\n"
+        output = io.StringIO()
+        write_markdown_html(io.StringIO(markdown), output)
+        self.assertEqual(output.getvalue(), markdown_to_html_node(markdown).to_html())
+
+    def test_yields_blocks_lazily(self):
+        def lines():
+            yield "# Title"
+            yield ""
+            raise AssertionError("read past the first block")
+
+        blocks = iter_blocks(lines())
+        self.assertEqual(next(blocks), (BlockType.HEADING1, ["# Title"]))
+
+
+class TestDocument(unittest.TestCase):
+    markdown = (
+        "Intro with [a link](/a)\n\n"
+        "# The *Title*\n\n"
+        "## Setup\n\n"
+        "* see [docs](/docs) and ![logo](/logo.png)\n\n"
+        "## Setup\n\n"
+        "# Second h1"
+    )
+
+    def tearDown(self):
+        set_block_cache(None)
+
+    def test_collects_title_headings_and_stats(self):
+        document = markdown_to_document(self.markdown)
+        self.assertEqual(document.title, "The Title")
+        self.assertEqual(
+            document.headings,
+            [
+                Heading(1, "The Title", "the-title"),
+                Heading(2, "Setup", "setup"),
+                Heading(2, "Setup", "setup-1"),
+                Heading(1, "Second h1", "second-h1"),
+            ],
+        )
+        self.assertEqual(document.links, ["/a", "/docs"])
+        self.assertEqual(document.images, ["/logo.png"])
+        self.assertEqual(document.word_count, 13)
+
+    def test_root_matches_markdown_to_html_node(self):
+        document = markdown_to_document(self.markdown)
+        self.assertEqual(
+            document.root.to_html(), markdown_to_html_node(self.markdown).to_html()
+        )
+
+    def test_anchors_and_toc(self):
+        document = markdown_to_document("# Title\n\n## Sub part", anchors=True)
+        self.assertEqual(
+            document.root.to_html(),
+            '<div><h1 id="title">Title</h1><h2 id="sub-part">Sub part</h2></div>',
+        )
+        self.assertEqual(
+            document.toc().to_html(),
+            '<ul class="toc"><li class="toc-h1"><a href="#title">Title</a></li>'
+            '<li class="toc-h2"><a href="#sub-part">Sub part</a></li></ul>',
+        )
+
+    def test_block_cache_hits_fill_the_document(self):
+        set_block_cache(BlockCache())
+        first = markdown_to_document(self.markdown)
+        second = markdown_to_document(self.markdown, anchors=True)
+        self.assertEqual(second.headings, first.headings)
+        self.assertEqual(second.links, first.links)
+        self.assertEqual(second.word_count, first.word_count)
+        self.assertIn('<h2 id="setup-1">', second.root.to_html())
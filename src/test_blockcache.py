@@ -0,0 +1,81 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from block import markdown_to_html_node, set_block_cache
+from blockcache import BlockCache
+
+FOOTER = "Licensed under *CC BY-SA*, see [the licence](/licence)"
+
+
+class TestBlockCache(unittest.TestCase):
+    def tearDown(self):
+        set_block_cache(None)
+
+    def test_evicts_least_recently_used(self):
+        cache = BlockCache(max_entries=2)
+        cache.put("a", "<p>a</p>")
+        cache.put("b", "<p>b</p>")
+        cache.get("a")
+        cache.put("c", "<p>c</p>")
+        self.assertEqual(list(cache.entries), ["a", "c"])
+
+    def test_counts_hits_and_misses(self):
+        cache = BlockCache()
+        cache.get("a")
+        cache.put("a", "<p>a</p>")
+        cache.get("a")
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_key_depends_on_block_type(self):
+        self.assertNotEqual(BlockCache.key("p", "x"), BlockCache.key("h1", "x"))
+
+    def test_key_depends_on_salt(self):
+        self.assertEqual(BlockCache.key("p", "x"), BlockCache.key("p", "x", ""))
+        self.assertNotEqual(BlockCache.key("p", "x"), BlockCache.key("p", "x", "a"))
+
+    def test_repeated_blocks_render_identically_from_cache(self):
+        markdown = f"# Page\n\n{FOOTER}\n\n* a\n* b\n\n{FOOTER}"
+        expected = markdown_to_html_node(markdown).to_html()
+        cache = BlockCache()
+        set_block_cache(cache)
+        self.assertEqual(markdown_to_html_node(markdown).to_html(), expected)
+        self.assertEqual(markdown_to_html_node(markdown).to_html(), expected)
+        self.assertEqual((cache.hits, cache.misses), (5, 3))
+
+    def test_merges_what_a_worker_learned(self):
+        worker = BlockCache()
+        worker.put("a", ["<p>a</p>"])
+        worker.record_new = True
+        worker.get("a")
+        worker.get("b")
+        worker.put("b", ["<p>b</p>"])
+        parent = BlockCache()
+        parent.merge(*worker.take_new())
+        self.assertEqual(list(parent.entries), ["b"])
+        self.assertEqual((parent.hits, parent.misses), (1, 1))
+        self.assertEqual(worker.take_new(), ([], 0, 0))
+
+    def test_persists_between_builds(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "blocks.json"
+            cache = BlockCache(path=path)
+            cache.put("a", "<p>a</p>")
+            cache.save()
+
+            reloaded = BlockCache(path=path)
+            reloaded.load()
+            self.assertEqual(reloaded.get("a"), "<p>a</p>")
+
+    def test_ignores_cache_from_other_parser_version(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "blocks.json"
+            path.write_text(json.dumps({"version": "old", "entries": [["a", "x"]]}))
+            cache = BlockCache(path=path)
+            cache.load()
+            self.assertEqual(cache.entries, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import gzip
+import lzma
+import tempfile
+import unittest
+from pathlib import Path
+
+from parameterized import parameterized
+
+from compress import Compressor
+from document import generate_pages_recursively, set_compressor
+from manifest import Manifest
+from sync import sync_directory
+
+
+class TestCompressor(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.public = self.root / "public"
+        self.public.mkdir()
+        self.page = self.public / "index.html"
+        self.page.write_text("<p>hello</p>" * 1000)
+        self.state = self.root / "compressed.json"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def compressor(self, codecs=("gz",)):
+        compressor = Compressor(self.public, codecs, self.state)
+        compressor.load()
+        return compressor
+
+    def test_writes_siblings_for_every_codec(self):
+        compressor = self.compressor(("gz", "xz"))
+        compressor.submit(self.page)
+        compressor.submit(self.public / "missing.png")
+        self.assertEqual(compressor.close(), [])
+        data = self.page.read_bytes()
+        self.assertEqual(
+            gzip.decompress(self.page.with_suffix(".html.gz").read_bytes()), data
+        )
+        self.assertEqual(
+            lzma.decompress(self.page.with_suffix(".html.xz").read_bytes()), data
+        )
+
+    def test_only_recompresses_changed_content(self):
+        compressor = self.compressor()
+        compressor.submit(self.page)
+        compressor.close()
+
+        compressor = self.compressor()
+        compressor.submit(self.page)
+        compressor.close()
+        self.assertEqual(compressor.compressed, 0)
+
+        self.page.write_text("<p>changed</p>")
+        compressor = self.compressor()
+        compressor.submit(self.page)
+        compressor.close()
+        self.assertEqual(compressor.compressed, 1)
+        sibling = self.page.with_suffix(".html.gz")
+        self.assertEqual(gzip.decompress(sibling.read_bytes()), b"<p>changed</p>")
+
+    def test_output_is_reproducible(self):
+        compressor = self.compressor()
+        compressor.compress(self.page)
+        first = self.page.with_suffix(".html.gz").read_bytes()
+        compressor.hashes = {}
+        compressor.compress(self.page)
+        compressor.close()
+        self.assertEqual(self.page.with_suffix(".html.gz").read_bytes(), first)
+
+    def test_sync_compresses_and_removes_siblings(self):
+        static = self.root / "static"
+        static.mkdir()
+        (static / "index.css").write_text("body {}")
+        manifest = Manifest(self.root / "manifest.json")
+        compressor = self.compressor()
+        sync_directory(static, self.public, manifest, compressor=compressor)
+        compressor.wait()
+        self.assertTrue((self.public / "index.css.gz").exists())
+
+        (static / "index.css").unlink()
+        sync_directory(static, self.public, manifest, compressor=compressor)
+        compressor.close()
+        self.assertFalse((self.public / "index.css.gz").exists())
+
+    @parameterized.expand((("serial", 1, 0), ("parallel", 2, 0), ("pipelined", 1, 2)))
+    def test_compresses_unchanged_pages_(self, name, workers, pipeline):
+        content = self.root / "content"
+        content.mkdir()
+        (content / "about.md").write_text("# About\n\ntext")
+        template = self.root / "template.html"
+        template.write_text("{{ Content }}")
+        manifest = Manifest(self.root / "manifest.json")
+        generate_pages_recursively(content, template, self.public, manifest)
+
+        compressor = self.compressor()
+        set_compressor(compressor)
+        self.addCleanup(set_compressor, None)
+        generate_pages_recursively(
+            content, template, self.public, manifest, workers, pipeline
+        )
+        compressor.close()
+        page = self.public / "about.html"
+        self.assertEqual(
+            gzip.decompress(page.with_suffix(".html.gz").read_bytes()),
+            page.read_bytes(),
+        )
@@ -1,8 +1,15 @@
+import contextlib
+import io
+import tempfile
 import unittest
+from pathlib import Path
 
 from parameterized import parameterized
 
-from document import extract_title
+from block import set_block_cache
+from blockcache import BlockCache
+from document import extract_title, generate_pages_recursively, set_minify_pages
+from manifest import Manifest, file_hash
 
 
 class TestExtractTitle(unittest.TestCase):
@@ -54,3 +61,93 @@ This is a document
 And one paragraph
 """
         self.assertRaises(Exception, lambda: extract_title(md))
+
+
+class TestParallelBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.content = self.root / "content"
+        self.template = self.root / "template.html"
+        self.template.write_text("<title>{{ Title }}</title>{{ Content }}")
+        for i in range(8):
+            section = self.content / f"section{i}"
+            section.mkdir(parents=True)
+            (section / "index.md").write_text(
+                f"# Section {i}\n\n* one **{i}**\n* two [link](/x{i})"
+            )
+        (self.content / "broken.md").write_text("no title")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self, name, workers, pipeline=0):
+        dest = self.root / name
+        dest.mkdir()
+        generate_pages_recursively(
+            self.content, self.template, dest, None, workers, pipeline
+        )
+        return {
+            path.relative_to(dest): path.read_bytes()
+            for path in dest.rglob("*")
+            if path.is_file()
+        }
+
+    def test_output_matches_serial_build(self):
+        serial = self.build("serial", 1)
+        parallel = self.build("parallel", 4)
+        self.assertEqual(len(serial), 8)
+        self.assertEqual(serial, parallel)
+
+    def test_parallel_build_fills_the_block_cache(self):
+        # A page that fails in a worker takes what it learned with it
+        (self.content / "broken.md").unlink()
+        cache = BlockCache()
+        set_block_cache(cache)
+        self.addCleanup(set_block_cache, None)
+        serial = self.build("serial", 1)
+        entries = dict(cache.entries)
+        cache.entries.clear()
+        self.assertEqual(self.build("parallel", 4), serial)
+        self.assertEqual(dict(cache.entries), entries)
+        self.assertGreater(cache.misses, 0)
+
+    @parameterized.expand((("serial", 1, 0), ("parallel", 4, 0), ("pipelined", 1, 2)))
+    def test_reports_failed_pages_(self, name, workers, pipeline):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.build(name, workers, pipeline)
+        self.assertIn("Could not generate", output.getvalue())
+        self.assertTrue(output.getvalue().endswith("Generated 8/9 pages (1 failed)\n"))
+
+    def test_pipelined_output_matches_serial_build(self):
+        serial = self.build("serial", 1)
+        pipelined = self.build("pipelined", 1, pipeline=2)
+        self.assertEqual(serial, pipelined)
+
+    def test_fills_toc_slot_with_anchored_headings(self):
+        self.template.write_text("{{ Toc }}{{ Content }}")
+        output = self.build("toc", 1)[Path("section0/index.html")].decode()
+        self.assertTrue(
+            output.startswith(
+                '<ul class="toc"><li class="toc-h1"><a href="#section-0">'
+            )
+        )
+        self.assertIn('<h1 id="section-0">Section 0</h1>', output)
+
+    def test_minified_pages_rebuild_when_minifying_is_toggled(self):
+        self.template.write_text("<title>\n  {{ Title }}\n</title>\n{{ Content }}\n")
+        dest = self.root / "public"
+        dest.mkdir()
+        manifest = Manifest(self.root / "manifest.json")
+        page = dest / "section0" / "index.html"
+        generate_pages_recursively(self.content, self.template, dest, manifest)
+        self.assertIn("\n", page.read_text())
+
+        set_minify_pages(True)
+        self.addCleanup(set_minify_pages, False)
+        generate_pages_recursively(self.content, self.template, dest, manifest)
+        self.assertTrue(page.read_text().startswith("<title>Section 0</title><div>"))
+        self.assertNotIn("\n", page.read_text())
+        entry = manifest.pages[str(self.content / "section0" / "index.md")]
+        self.assertEqual(entry["output"], file_hash(page))
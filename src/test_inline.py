@@ -8,9 +8,13 @@ from inline import (
     split_node_delimiter,
     extract_markdown_images,
     extract_markdown_links,
+    extract_markdown_references,
     split_nodes_images,
     split_nodes_links,
     text_to_text_nodes,
+    scan_text_to_text_nodes,
+    split_text_to_text_nodes,
+    set_inline_parser,
 )
 
 
@@ -350,3 +354,73 @@ class TestTextToTextNode(unittest.TestCase):
     def test_text(self, name, input, expected_output):
         output = text_to_text_nodes(input)
         self.assertEqual(output, expected_output)
+
+
+class TestInlineScanner(unittest.TestCase):
+    def tearDown(self):
+        set_inline_parser("scan")
+
+    @parameterized.expand(
+        (
+            ("empty", ""),
+            ("plain", "just some text"),
+            ("nested delimiters", "**bold** and *it* and _it_ and `code`"),
+            ("image with empty alt", "see ![](/img.png) here"),
+            ("link with styled text", "go [to *the* site](/site) now"),
+            ("delimiter in url", "a [link](/some_page_here) b"),
+            ("image then link", "![a](/a.png)[b](/b)"),
+            ("adjacent delimiters", "**a****b**"),
+            ("multiline", "one *two*\nthree `four`\n"),
+        )
+    )
+    def test_matches_split_pipeline_for_(self, name, text):
+        self.assertEqual(scan_text_to_text_nodes(text), split_text_to_text_nodes(text))
+
+    @parameterized.expand(
+        (
+            ("unclosed bold", "**bold"),
+            ("unclosed code", "a `b"),
+            ("odd italic inside link", "[a*b](/c)"),
+        )
+    )
+    def test_raises_like_split_pipeline_for_(self, name, text):
+        self.assertRaises(Exception, lambda: split_text_to_text_nodes(text))
+        self.assertRaises(Exception, lambda: scan_text_to_text_nodes(text))
+
+    def test_switch_selects_parser(self):
+        text = "a ![x](/x.png) b"
+        set_inline_parser("split")
+        self.assertEqual(text_to_text_nodes(text), split_text_to_text_nodes(text))
+        set_inline_parser("scan")
+        self.assertEqual(text_to_text_nodes(text), scan_text_to_text_nodes(text))
+
+    def test_switch_rejects_unknown_parser(self):
+        self.assertRaises(ValueError, lambda: set_inline_parser("regex"))
+
+
+class TestPatternExtractors(unittest.TestCase):
+    def test_splits_many_images_in_one_node(self):
+        node = TextNode("a ![x](/x.png) b ![y](/y.png) c", TextType.NORMAL)
+        self.assertEqual(
+            split_nodes_images([node]),
+            [
+                TextNode("a ", TextType.NORMAL),
+                TextNode("x", TextType.IMAGE, "/x.png"),
+                TextNode(" b ", TextType.NORMAL),
+                TextNode("y", TextType.IMAGE, "/y.png"),
+                TextNode(" c", TextType.NORMAL),
+            ],
+        )
+
+    def test_splits_many_links_in_one_node(self):
+        text = " ".join(f"[{i}](/{i})" for i in range(100))
+        nodes = split_nodes_links([TextNode(text, TextType.NORMAL)])
+        links = [node for node in nodes if node.text_type == TextType.LINK]
+        self.assertEqual(len(links), 100)
+        self.assertEqual(links[-1], TextNode("99", TextType.LINK, "/99"))
+
+    def test_extracts_all_references_in_one_scan(self):
+        text = "![i](/a.png) [l](/b)\n\n* [m](/c) and ![j](/d.png)"
+        images, links = extract_markdown_references(text)
+        self.assertEqual(images, [("i", "/a.png"), ("j", "/d.png")])
+        self.assertEqual(links, [("l", "/b"), ("m", "/c")])
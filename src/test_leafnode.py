@@ -1,3 +1,4 @@
+import pickle
 import unittest
 
 from leafnode import LeafNode
@@ -18,3 +19,12 @@ class LeafNodeTest(unittest.TestCase):
         node = LeafNode(None, "This is raw text", None)
         html = node.to_html()
         self.assertEqual(html, "This is raw text")
+
+    def test_has_no_instance_dict(self):
+        node = LeafNode("b", "Bold")
+        self.assertFalse(hasattr(node, "__dict__"))
+        self.assertEqual(repr(node), "HTMLNode('b', 'Bold', None, None)")
+
+    def test_survives_pickling(self):
+        node = LeafNode("a", "link", {"href": "/x"})
+        self.assertEqual(pickle.loads(pickle.dumps(node)).to_html(), node.to_html())
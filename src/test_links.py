@@ -0,0 +1,83 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from parameterized import parameterized
+
+from document import generate_pages_recursively, set_link_checker
+from links import LinkChecker
+
+
+class TestLinkChecker(unittest.TestCase):
+    def setUp(self):
+        self.root = Path("/site")
+        self.checker = LinkChecker(self.root)
+        self.checker.add_targets(
+            [
+                self.root / "index.html",
+                self.root / "blog" / "index.html",
+                self.root / "blog" / "post.html",
+                self.root / "images" / "a b.png",
+            ]
+        )
+
+    @parameterized.expand(
+        (
+            ("absolute page", "/blog/post.html", True),
+            ("directory index", "/blog", True),
+            ("directory with slash", "/blog/", True),
+            ("site root", "/", True),
+            ("relative", "post.html", True),
+            ("parent relative", "../images/a%20b.png", True),
+            ("query and fragment", "/blog/post.html?x=1#top", True),
+            ("missing page", "/blog/missing.html", False),
+            ("file as directory", "/blog/post.html/", False),
+        )
+    )
+    def test_resolves_(self, name, url, exists):
+        broken = self.checker.check(self.root / "blog" / "post.html", [url])
+        self.assertEqual(broken, [] if exists else [url])
+
+    @parameterized.expand(
+        (
+            ("external", "https://example.com/x"),
+            ("protocol relative", "//example.com/x"),
+            ("mail", "mailto:someone@example.com"),
+            ("fragment", "#section"),
+        )
+    )
+    def test_skips_(self, name, url):
+        self.assertEqual(self.checker.check(self.root / "index.html", [url]), [])
+        self.assertEqual(self.checker.checked, 0)
+
+
+class TestBuildLinkCheck(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+
+    def tearDown(self):
+        set_link_checker(None)
+        self.tmp.cleanup()
+
+    def test_checks_pages_as_they_render(self):
+        content = self.root / "content"
+        (content / "blog").mkdir(parents=True)
+        (content / "index.md").write_text(
+            "# Home\n\n[post](/blog/post.html) [gone](/gone) ![logo](/logo.png)"
+        )
+        (content / "blog" / "post.md").write_text("# Post\n\n[home](../index.html)")
+        template = self.root / "template.html"
+        template.write_text("{{ Content }}")
+        public = self.root / "public"
+        public.mkdir()
+        static = self.root / "static"
+        static.mkdir()
+        (static / "logo.png").write_bytes(b"png")
+
+        checker = LinkChecker(public)
+        checker.add_directory(static)
+        set_link_checker(checker)
+        generate_pages_recursively(content, template, public)
+        self.assertEqual(checker.report(), [("/index.html", "/gone")])
+        self.assertEqual(checker.checked, 4)
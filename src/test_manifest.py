@@ -0,0 +1,68 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from document import generate_pages_recursively
+from manifest import Manifest
+
+
+class TestIncrementalBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        self.content = root / "content"
+        self.public = root / "public"
+        self.template = root / "template.html"
+        (self.content / "blog").mkdir(parents=True)
+        self.public.mkdir()
+        self.template.write_text("<title>{{ Title }}</title>{{ Content }}")
+        (self.content / "index.md").write_text("# Home\n\nWelcome")
+        (self.content / "blog" / "post.md").write_text("# Post\n\nHello")
+        self.manifest_path = root / ".cache" / "manifest.json"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self):
+        manifest = Manifest(self.manifest_path)
+        manifest.load()
+        generate_pages_recursively(self.content, self.template, self.public, manifest)
+        removed = manifest.remove_stale()
+        manifest.save()
+        return manifest, removed
+
+    def test_skips_unchanged_pages(self):
+        self.build()
+        post = self.public / "blog" / "post.html"
+        post.write_text("untouched")
+        self.build()
+        self.assertEqual(post.read_text(), "untouched")
+
+    def test_rebuilds_changed_source(self):
+        self.build()
+        (self.content / "index.md").write_text("# Home\n\nChanged")
+        self.build()
+        self.assertIn("<p>Changed</p>", (self.public / "index.html").read_text())
+
+    def test_rebuilds_everything_when_template_changes(self):
+        self.build()
+        self.template.write_text("<h1>{{ Title }}</h1>{{ Content }}")
+        self.build()
+        for page in ("index.html", "blog/post.html"):
+            self.assertTrue((self.public / page).read_text().startswith("<h1>"))
+
+    def test_removes_outputs_of_deleted_sources(self):
+        self.build()
+        (self.content / "blog" / "post.md").unlink()
+        _, removed = self.build()
+        self.assertEqual(removed, [self.public / "blog" / "post.html"])
+        self.assertFalse((self.public / "blog").exists())
+
+    def test_records_output_hash(self):
+        manifest, _ = self.build()
+        entry = manifest.pages[str(self.content / "index.md")]
+        self.assertEqual(set(entry), {"dest", "source", "template", "output", "links"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,165 @@
+import gzip
+import io
+import tempfile
+import unittest
+from pathlib import Path
+
+from parameterized import parameterized
+
+from compress import Compressor
+from minify import AssetMinifier, HtmlMinifier, minify_css, minify_html
+from sync import sync_directory
+
+
+class TestMinifyHtml(unittest.TestCase):
+    @parameterized.expand(
+        (
+            (
+                "indentation between block tags",
+                "<!DOCTYPE html>\n<html>\n  <head>\n    <title> Hi </title>\n"
+                "  </head>\n  <body>\n    <p>text</p>\n  </body>\n</html>\n",
+                "<!DOCTYPE html><html><head><title>Hi</title></head>"
+                "<body><p>text</p></body></html>",
+            ),
+            (
+                "spaces between inline elements are kept",
+                "<p>a  <b>bold</b>\n <i>italic</i> !</p>",
+                "<p>a <b>bold</b> <i>italic</i> !</p>",
+            ),
+            (
+                "pre and code are untouched",
+                "<div>\n  <pre><code>a\n    b  c\n</code></pre>\n  <p>x <code>1  2</code></p>\n</div>",
+                "<div><pre><code>a\n    b  c\n</code></pre><p>x <code>1  2</code></p></div>",
+            ),
+            (
+                "non-breaking spaces are content",
+                "<p>\xa0a\xa0</p>",
+                "<p>\xa0a\xa0</p>",
+            ),
+            (
+                "comments keep the whitespace around them",
+                "<p>a <!-- > --> b</p>",
+                "<p>a<!-- > --> b</p>",
+            ),
+            (
+                "unescaped angle brackets in text",
+                "<p>if a < b and  c > d</p>\n<p>1 <</p>",
+                "<p>if a < b and c > d</p><p>1 <</p>",
+            ),
+            (
+                "script content is not parsed",
+                '<script>\n  var s = "<pre>";\n</script>\n<p>a   b</p>',
+                '<script>\n  var s = "<pre>";\n</script><p>a b</p>',
+            ),
+        )
+    )
+    def test_minifies_(self, name, html, expected):
+        self.assertEqual(minify_html(html), expected)
+
+    def test_streams_writes_split_anywhere(self):
+        html = (
+            "<div>\n  <p class='x'>one < two</p>\n  <pre>a\n b</pre> <!-- c -->\n"
+            "<script>if (a</b) {}</script>\n</div>"
+        )
+        for size in range(1, 8):
+            output = io.StringIO()
+            minifier = HtmlMinifier(output)
+            for start in range(0, len(html), size):
+                minifier.write(html[start : start + size])
+            minifier.close()
+            self.assertEqual(output.getvalue(), minify_html(html))
+
+
+class TestMinifyCss(unittest.TestCase):
+    @parameterized.expand(
+        (
+            (
+                "whitespace and last semicolon",
+                "body {\n  color: red;\n  margin : 0 auto;\n}\n",
+                "body{color:red;margin :0 auto}",
+            ),
+            (
+                "comments",
+                "/* header */\nh1, h2 > a { color: #fff; } /* done */",
+                "h1,h2>a{color:#fff}",
+            ),
+            (
+                "strings are untouched",
+                'a::before { content: "a ;  } /* b */"; }',
+                'a::before{content:"a ;  } /* b */"}',
+            ),
+            (
+                "descendant pseudo classes and calc",
+                "div :first-child { width: calc(100%  -  2px); }",
+                "div :first-child{width:calc(100% - 2px)}",
+            ),
+        )
+    )
+    def test_minifies_(self, name, css, expected):
+        self.assertEqual(minify_css(css), expected)
+
+
+class TestAssetMinifier(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.static = self.root / "static"
+        self.static.mkdir()
+        (self.static / "index.css").write_text("body {\n  margin: 0;\n}\n")
+        (self.static / "logo.png").write_bytes(b"\x89PNG  ")
+        self.public = self.root / "public"
+        self.cache = self.root / "minified"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def sync(self, version=None):
+        minifier = AssetMinifier(self.cache)
+        minifier.version = version or minifier.version
+        sync_directory(self.static, self.public, minifier=minifier)
+        minifier.prune()
+        return minifier
+
+    def test_minifies_each_source_once(self):
+        self.assertEqual(self.sync().minified, 1)
+        self.assertEqual((self.public / "index.css").read_text(), "body{margin:0}")
+        self.assertEqual((self.public / "logo.png").read_bytes(), b"\x89PNG  ")
+
+        inode = (self.public / "index.css").stat().st_ino
+        self.assertEqual(self.sync().minified, 0)
+        self.assertEqual((self.public / "index.css").stat().st_ino, inode)
+
+    def test_prunes_copies_of_changed_sources(self):
+        self.sync()
+        (self.static / "index.css").write_text("p { margin: 0 }")
+        self.assertEqual(self.sync().minified, 1)
+        self.assertEqual((self.public / "index.css").read_text(), "p{margin:0}")
+        self.assertEqual(len(list(self.cache.iterdir())), 1)
+
+    def test_other_minifier_version_minifies_again(self):
+        self.sync()
+        self.assertEqual(self.sync(version="other").minified, 1)
+        self.assertEqual(len(list(self.cache.iterdir())), 1)
+
+    def test_compressed_siblings_hold_the_minified_bytes(self):
+        compressor = Compressor(self.public, state_path=self.root / "compressed.json")
+        sync_directory(self.static, self.public, use_hash=True, compressor=compressor)
+        compressor.wait()
+        minifier = AssetMinifier(self.cache)
+        sync_directory(
+            self.static,
+            self.public,
+            use_hash=True,
+            compressor=compressor,
+            minifier=minifier,
+        )
+        compressor.close()
+        css = self.public / "index.css"
+        self.assertEqual(
+            gzip.decompress(css.with_name("index.css.gz").read_bytes()),
+            css.read_bytes(),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,4 @@
+import io
 import unittest
 
 from leafnode import LeafNode
@@ -104,3 +105,27 @@ class ParentNodeTest(unittest.TestCase):
             + '<div id="content" class="content"><p>Some content</p><p>And some more!</p></div>'
             + "</body>",
         )
+
+    def test_iter_html_yields_fragments(self):
+        node = ParentNode(
+            "div",
+            [ParentNode("p", [LeafNode("b", "Bold"), LeafNode(None, "text")])],
+            {"id": "main"},
+        )
+        self.assertEqual(
+            list(node.iter_html()),
+            ['<div id="main">', "<p>", "<b>Bold</b>", "text", "</p>", "</div>"],
+        )
+
+    def test_write_html_matches_to_html(self):
+        node = ParentNode(
+            "ul",
+            [ParentNode("li", [LeafNode("i", f"item {i}")]) for i in range(50)],
+        )
+        output = io.StringIO()
+        node.write_html(output)
+        self.assertEqual(output.getvalue(), node.to_html())
+
+    def test_write_html_raise_valueerror_for_invalid_child(self):
+        node = ParentNode("div", [LeafNode("b", "Bold"), ParentNode("p", [])])
+        self.assertRaises(ValueError, lambda: node.write_html(io.StringIO()))
@@ -0,0 +1,72 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from document import generate_pages_recursively, set_parse_cache
+from manifest import Manifest
+from parsecache import ParseCache
+
+
+class TestParseCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.cache = ParseCache(self.root / "cache")
+
+    def tearDown(self):
+        set_parse_cache(None)
+        self.tmp.cleanup()
+
+    def test_round_trips_slot_values(self):
+        values = {"Title": "Title", "Content": "<div><p>multi\nline</p></div>"}
+        self.cache.put("ab12", values)
+        self.assertEqual(self.cache.get("ab12"), values)
+        self.assertIsNone(self.cache.get("cd34"))
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_prune_drops_other_parser_versions(self):
+        stale = self.root / "cache" / "oldversion" / "ab" / "ab12"
+        stale.parent.mkdir(parents=True)
+        stale.write_bytes(b"")
+        self.cache.put("ab12", {"Title": "Title", "Content": "<div></div>"})
+        self.cache.prune()
+        self.assertFalse(stale.exists())
+        self.assertIsNotNone(self.cache.get("ab12"))
+
+    def test_prune_evicts_least_recently_used(self):
+        for i, key in enumerate(("aa01", "bb02", "cc03")):
+            self.cache.put(key, {"Title": "Title", "Content": "x" * 1000 + key})
+            os.utime(self.cache.entry_path(key), (i, i))
+        self.cache.get("aa01")
+        self.cache.max_bytes = sum(
+            self.cache.entry_path(key).stat().st_size for key in ("aa01", "cc03")
+        )
+        self.assertEqual(self.cache.prune(), 1)
+        self.assertIsNone(self.cache.get("bb02"))
+        self.assertIsNotNone(self.cache.get("aa01"))
+
+    def test_template_change_refills_pages_from_cache(self):
+        content = self.root / "content"
+        public = self.root / "public"
+        content.mkdir()
+        public.mkdir()
+        template = self.root / "template.html"
+        template.write_text("{{ Title }}|{{ Content }}")
+        for name in ("a", "b"):
+            (content / f"{name}.md").write_text(f"# {name}\n\n*{name}*")
+        set_parse_cache(self.cache)
+        manifest = Manifest(self.root / "manifest.json")
+        generate_pages_recursively(content, template, public, manifest)
+
+        template.write_text("<h1>{{ Title }}</h1>{{ Content }}")
+        generate_pages_recursively(content, template, public, manifest)
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 2))
+        self.assertEqual(
+            (public / "a.html").read_text(),
+            "<h1>a</h1><div><h1>a</h1><p><i>a</i></p></div>",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
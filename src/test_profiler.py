@@ -0,0 +1,70 @@
+import json
+import tempfile
+import tracemalloc
+import unittest
+from pathlib import Path
+
+from block import markdown_to_html_node
+from profiler import NULL_STAGE, PROFILER, Profiler
+
+
+class TestProfiler(unittest.TestCase):
+    def tearDown(self):
+        PROFILER.__init__()
+        tracemalloc.stop()
+
+    def test_disabled_profiler_hands_out_null_stage(self):
+        self.assertIs(Profiler().stage("read"), NULL_STAGE)
+
+    def test_records_nested_stages_per_page(self):
+        profiler = Profiler()
+        profiler.enable()
+        with profiler.page("a.md"):
+            with profiler.stage("parse"):
+                with profiler.stage("inline"):
+                    data = [0] * 100_000
+                with profiler.stage("inline"):
+                    pass
+        del data
+        stages = profiler.pages["a.md"]
+        self.assertEqual(stages["inline"][2], 2)
+        self.assertGreaterEqual(stages["parse"][1], stages["inline"][1])
+        self.assertGreater(stages["inline"][1], 100_000)
+        names = [event["name"] for event in profiler.events]
+        self.assertEqual(names, ["parse", "page"])
+
+    def test_report_lists_slowest_pages_first(self):
+        profiler = Profiler()
+        profiler.enable()
+        for name, size in (("small.md", 10), ("big.md", 2_000)):
+            with profiler.page(name), profiler.stage("parse"):
+                markdown_to_html_node("\n\n".join(["*a* b"] * size))
+        report = profiler.report()
+        self.assertEqual(report["pages"], 2)
+        self.assertEqual(report["slowest_pages"][0]["page"], "big.md")
+        self.assertIn("parse", report["stages"])
+
+    def test_block_parser_reports_its_stages(self):
+        PROFILER.enable()
+        with PROFILER.page("doc.md"):
+            markdown_to_html_node("# Title\n\n* a\n* b")
+        self.assertEqual(
+            set(PROFILER.pages["doc.md"]),
+            {"page", "split", "classify", "inline", "tree"},
+        )
+
+    def test_writes_json_and_chrome_trace(self):
+        profiler = Profiler()
+        profiler.enable()
+        with profiler.page("a.md"), profiler.stage("read"):
+            pass
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "profile.json"
+            profiler.write_report(path)
+            self.assertEqual(json.loads(path.read_text())["pages"], 1)
+            trace = json.loads(path.with_suffix(".trace.json").read_text())
+            self.assertEqual(len(trace["traceEvents"]), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from document import generate_pages_recursively, set_search_index
+from manifest import Manifest
+from search import SearchIndex, postings
+
+
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.public = self.root / "public"
+        self.state = self.root / "search.json"
+
+    def tearDown(self):
+        set_search_index(None)
+        self.tmp.cleanup()
+
+    def index(self):
+        index = SearchIndex(self.public, self.state)
+        index.load()
+        return index
+
+    def read(self, name):
+        return json.loads((self.public / "search" / name).read_text())
+
+    def test_postings_keep_positions(self):
+        self.assertEqual(
+            postings("The ring, the Ring!"), {"the": [0, 2], "ring": [1, 3]}
+        )
+
+    def test_writes_prefix_shards_with_delta_positions(self):
+        index = self.index()
+        index.add("a.md", self.public / "a.html", "A", "ring of the ring")
+        index.add("b.md", self.public / "b" / "index.html", "B", "a ring")
+        index.write()
+        self.assertEqual(
+            self.read("pages.json"), [["/a.html", "A"], ["/b/index.html", "B"]]
+        )
+        self.assertEqual(self.read("meta.json")["shards"], ["a", "of", "ri", "th"])
+        self.assertEqual(self.read("shards/ri.json"), {"ring": [[0, 0, 3], [1, 1]]})
+
+    def test_incremental_update_only_rewrites_affected_shards(self):
+        index = self.index()
+        index.add("a.md", self.public / "a.html", "A", "elf")
+        index.add("b.md", self.public / "b.html", "B", "tower")
+        index.write()
+        index.save()
+        tower = self.public / "search" / "shards" / "to.json"
+        inode = tower.stat().st_ino
+
+        index = self.index()
+        index.add("a.md", self.public / "a.html", "A", "river")
+        index.retain(["a.md", "b.md"])
+        index.write()
+        self.assertEqual(tower.stat().st_ino, inode)
+        self.assertFalse((self.public / "search" / "shards" / "el.json").exists())
+        self.assertEqual(self.read("shards/ri.json"), {"river": [[0, 0]]})
+
+    def test_removed_pages_free_their_id(self):
+        index = self.index()
+        index.add("a.md", self.public / "a.html", "A", "ring")
+        index.add("b.md", self.public / "b.html", "B", "tower")
+        index.retain(["b.md"])
+        index.add("c.md", self.public / "c.html", "C", "river")
+        index.write()
+        self.assertEqual(self.read("pages.json"), [["/c.html", "C"], ["/b.html", "B"]])
+        self.assertEqual(self.read("meta.json")["shards"], ["ri", "to"])
+
+    def test_build_feeds_page_text(self):
+        content = self.root / "content"
+        content.mkdir()
+        (content / "index.md").write_text("# Home\n\n* a **bold** [link](/x)")
+        template = self.root / "template.html"
+        template.write_text("{{ Content }}")
+        self.public.mkdir()
+        index = self.index()
+        set_search_index(index)
+        generate_pages_recursively(content, template, self.public)
+        index.write()
+        self.assertEqual(self.read("pages.json"), [["/index.html", "Home"]])
+        self.assertEqual(self.read("shards/li.json"), {"link": [[0, 3]]})
+
+    def test_indexes_unchanged_pages_missing_from_the_index(self):
+        content = self.root / "content"
+        content.mkdir()
+        (content / "index.md").write_text("# Home\n\nhello")
+        template = self.root / "template.html"
+        template.write_text("{{ Content }}")
+        self.public.mkdir()
+        manifest = Manifest(self.root / "manifest.json")
+        generate_pages_recursively(content, template, self.public, manifest)
+
+        index = self.index()
+        set_search_index(index)
+        generate_pages_recursively(content, template, self.public, manifest)
+        index.write()
+        index.save()
+        self.assertEqual(self.read("pages.json"), [["/index.html", "Home"]])
+
+        # Indexed pages are skipped again
+        set_search_index(self.index())
+        jobs = generate_pages_recursively(content, template, self.public, manifest)
+        self.assertFalse(jobs[0].read(manifest))
+
+    def test_reindexes_pages_rendered_while_the_index_was_off(self):
+        content = self.root / "content"
+        content.mkdir()
+        source = content / "index.md"
+        source.write_text("# Home\n\nhello")
+        template = self.root / "template.html"
+        template.write_text("{{ Content }}")
+        self.public.mkdir()
+        manifest = Manifest(self.root / "manifest.json")
+        index = self.index()
+        set_search_index(index)
+        generate_pages_recursively(content, template, self.public, manifest)
+        index.save()
+        set_search_index(None)
+
+        source.write_text("# Home\n\ngoodbye")
+        generate_pages_recursively(content, template, self.public, manifest)
+
+        index = self.index()
+        set_search_index(index)
+        generate_pages_recursively(content, template, self.public, manifest)
+        index.write()
+        self.assertEqual(self.read("shards/go.json"), {"goodbye": [[0, 1]]})
+        self.assertNotIn("he", self.read("meta.json")["shards"])
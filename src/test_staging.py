@@ -0,0 +1,79 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from manifest import text_hash
+from staging import StagedOutput, replace_if_changed
+
+
+class TestReplaceIfChanged(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.dest = self.root / "page.html"
+        self.dest.write_text("<p>same</p>")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def replace(self, text):
+        tmp = self.root / ".page.html.tmp"
+        tmp.write_text(text)
+        return replace_if_changed(tmp, self.dest, text_hash(text))
+
+    def test_keeps_identical_file(self):
+        inode = self.dest.stat().st_ino
+        self.assertFalse(self.replace("<p>same</p>"))
+        self.assertEqual(self.dest.stat().st_ino, inode)
+        self.assertEqual(list(self.root.iterdir()), [self.dest])
+
+    def test_replaces_changed_file(self):
+        self.assertTrue(self.replace("<p>new</p>"))
+        self.assertEqual(self.dest.read_text(), "<p>new</p>")
+
+
+class TestStagedOutput(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.public = Path(self.tmp.name) / "public"
+        (self.public / "blog").mkdir(parents=True)
+        (self.public / "index.html").write_text("old index")
+        (self.public / "blog" / "post.html").write_text("post")
+        self.staged = StagedOutput(self.public)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_live_site_is_untouched_until_commit(self):
+        staging = self.staged.prepare()
+        replacement = staging / ".index.html.tmp"
+        replacement.write_text("new index")
+        replace_if_changed(replacement, staging / "index.html", text_hash("new index"))
+        self.assertEqual((self.public / "index.html").read_text(), "old index")
+
+        self.staged.commit()
+        self.assertEqual((self.public / "index.html").read_text(), "new index")
+        self.assertEqual((self.public / "blog" / "post.html").read_text(), "post")
+        self.assertFalse(staging.exists())
+
+    def test_prune_removes_files_not_kept(self):
+        staging = self.staged.prepare()
+        removed = self.staged.prune([staging / "index.html"])
+        self.assertEqual(removed, [staging / "blog" / "post.html"])
+        self.assertFalse((staging / "blog").exists())
+        self.staged.commit()
+        self.assertEqual([path.name for path in self.public.rglob("*")], ["index.html"])
+
+    def test_abort_keeps_live_site(self):
+        staging = self.staged.prepare()
+        (staging / "index.html").unlink()
+        self.staged.abort()
+        self.assertFalse(staging.exists())
+        self.assertEqual((self.public / "index.html").read_text(), "old index")
+
+    def test_first_build_moves_staging_into_place(self):
+        public = Path(self.tmp.name) / "fresh"
+        staged = StagedOutput(public)
+        (staged.prepare() / "index.html").write_text("hi")
+        staged.commit()
+        self.assertEqual((public / "index.html").read_text(), "hi")
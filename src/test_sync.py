@@ -0,0 +1,84 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from manifest import Manifest
+from staging import clone_tree
+from sync import sync_directory
+
+
+class TestSyncDirectory(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        self.static = root / "static"
+        self.public = root / "public"
+        (self.static / "images").mkdir(parents=True)
+        (self.static / "index.css").write_text("body {}")
+        (self.static / "images" / "a.png").write_bytes(b"\x89PNG" * 100)
+        self.manifest = Manifest(root / "manifest.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def sync(self, **kwargs):
+        return sync_directory(self.static, self.public, self.manifest, **kwargs)
+
+    def test_copies_new_files(self):
+        copied, removed = self.sync()
+        self.assertEqual(len(copied), 2)
+        self.assertEqual(removed, [])
+        self.assertEqual((self.public / "index.css").read_text(), "body {}")
+
+    def test_skips_unchanged_files(self):
+        self.sync()
+        copied, _ = self.sync()
+        self.assertEqual(copied, [])
+
+    def test_copies_changed_files(self):
+        self.sync()
+        (self.static / "index.css").write_text("body { color: red }")
+        copied, _ = self.sync()
+        self.assertEqual(copied, [self.public / "index.css"])
+        self.assertIn("red", (self.public / "index.css").read_text())
+
+    def test_hash_mode_ignores_touched_files(self):
+        self.sync(use_hash=True)
+        css = self.static / "index.css"
+        os.utime(css, ns=(0, css.stat().st_mtime_ns + 10**9))
+        copied, _ = self.sync(use_hash=True)
+        self.assertEqual(copied, [])
+        copied, _ = self.sync()
+        self.assertEqual(copied, [])
+
+    def test_touched_files_leave_a_hard_linked_dest_alone(self):
+        self.sync(use_hash=True)
+        live = self.public / "index.css"
+        mtime = live.stat().st_mtime_ns
+        staging = self.public.with_name("staging")
+        clone_tree(self.public, staging)
+        css = self.static / "index.css"
+        os.utime(css, ns=(0, css.stat().st_mtime_ns + 10**9))
+        sync_directory(self.static, staging, self.manifest, use_hash=True)
+        self.assertEqual(live.stat().st_mtime_ns, mtime)
+
+    def test_removes_stale_files_only(self):
+        self.sync()
+        page = self.public / "index.html"
+        page.write_text("generated page")
+        (self.static / "images" / "a.png").unlink()
+        _, removed = self.sync()
+        self.assertEqual(removed, [self.public / "images" / "a.png"])
+        self.assertFalse((self.public / "images").exists())
+        self.assertTrue(page.exists())
+
+    def test_hard_links_when_asked(self):
+        self.sync(link=True)
+        self.assertTrue(
+            os.path.samefile(self.static / "index.css", self.public / "index.css")
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
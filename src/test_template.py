@@ -0,0 +1,155 @@
+import io
+import tempfile
+import unittest
+from pathlib import Path
+
+from parameterized import parameterized
+
+from document import generate_pages_recursively
+from manifest import Manifest
+from template import Template, TemplateLoader
+
+
+class TestTemplate(unittest.TestCase):
+    def test_compiles_fragments_and_slots(self):
+        template = Template("<title>{{ Title }}</title><main>{{ Content }}</main>")
+        self.assertEqual(template.fragments, ["<title>", "</title><main>", "</main>"])
+        self.assertEqual(template.slots, ["Title", "Content"])
+
+    @parameterized.expand(
+        (
+            ("no slots", "<p>static</p>", {}, "<p>static</p>"),
+            (
+                "title and content",
+                "<h1>{{ Title }}</h1>{{ Content }}",
+                {"Title": "Hi", "Content": "<p>body</p>"},
+                "<h1>Hi</h1><p>body</p>",
+            ),
+            (
+                "repeated slot",
+                "{{ Title }} - {{ Title }}",
+                {"Title": "Hi"},
+                "Hi - Hi",
+            ),
+            (
+                "unknown slot is left untouched",
+                "{{ Title }}{{  Other }}",
+                {"Title": "Hi"},
+                "Hi{{  Other }}",
+            ),
+            (
+                "slot values are not re-expanded",
+                "{{ Title }}|{{ Content }}",
+                {"Title": "{{ Content }}", "Content": "body"},
+                "{{ Content }}|body",
+            ),
+        )
+    )
+    def test_renders_(self, name, source, values, expected):
+        output = io.StringIO()
+        Template(source).render(output, values)
+        self.assertEqual(output.getvalue(), expected)
+
+    def test_points_asset_references_at_fingerprints(self):
+        template = Template(
+            '<link href="/index.css"><img src="/logo.png?v=1">{{ Content }}'
+            '<a href="/about.html">'
+        )
+        urls = {"/index.css": "/index.0123456789ab.css", "/logo.png": "/logo.1.png"}
+        fingerprinted = template.with_asset_urls(urls)
+        self.assertEqual(
+            fingerprinted.fragments,
+            [
+                '<link href="/index.0123456789ab.css"><img src="/logo.1.png?v=1">',
+                '<a href="/about.html">',
+            ],
+        )
+        self.assertNotEqual(fingerprinted.digest, template.digest)
+        self.assertIs(template.with_asset_urls({"/other.css": "/x.css"}), template)
+
+
+class TestTemplateLoader(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.content = self.root / "content"
+        (self.content / "blog").mkdir(parents=True)
+        self.base = self.root / "template.html"
+        self.base.write_text("<html>{{ Title }}|{{ Content }}</html>")
+        self.section = self.content / "blog" / "_template.html"
+        self.section.write_text(
+            '{{ extends "../../template.html" }}\n<article>{{ Content }}</article>'
+        )
+        (self.content / "index.md").write_text("# Home")
+        (self.content / "blog" / "post.md").write_text("# Post")
+        (self.content / "blog" / "other.md").write_text("# Other")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def render(self, template, **values):
+        output = io.StringIO()
+        template.render(output, values)
+        return output.getvalue()
+
+    def test_flattens_inheritance_chain(self):
+        template = TemplateLoader(self.base).load(self.section)
+        self.assertEqual(
+            self.render(template, Title="T", Content="<p>c</p>"),
+            "<html>T|<article><p>c</p></article></html>",
+        )
+        self.assertEqual(template.chain, [self.section, self.base])
+
+    def test_compiles_each_template_once(self):
+        loader = TemplateLoader(self.base, self.content)
+        post = loader.for_page(self.content / "blog" / "post.md")
+        other = loader.for_page(self.content / "blog" / "other.md")
+        self.assertIs(post, other)
+        self.assertIs(
+            loader.for_page(self.content / "index.md"), loader.load(self.base)
+        )
+
+    def test_page_template_wins_over_directory_template(self):
+        page_template = self.content / "blog" / "post.template.html"
+        page_template.write_text("<pre>{{ Content }}</pre>")
+        loader = TemplateLoader(self.base, self.content)
+        post = loader.for_page(self.content / "blog" / "post.md")
+        self.assertEqual(self.render(post, Content="x"), "<pre>x</pre>")
+
+    def test_records_pages_using_each_template(self):
+        loader = TemplateLoader(self.base, self.content)
+        for page in self.content.rglob("*.md"):
+            loader.for_page(page)
+        self.assertEqual(
+            loader.pages_using(self.section),
+            {self.content / "blog" / "post.md", self.content / "blog" / "other.md"},
+        )
+        self.assertEqual(len(loader.pages_using(self.base)), 3)
+
+    def test_rejects_inheritance_cycles(self):
+        self.base.write_text('{{ extends "content/blog/_template.html" }}')
+        loader = TemplateLoader(self.base)
+        self.assertRaises(Exception, lambda: loader.load(self.section))
+
+    def test_section_layout_change_rebuilds_only_its_pages(self):
+        public = self.root / "public"
+        public.mkdir()
+        manifest = Manifest(self.root / "manifest.json")
+        generate_pages_recursively(self.content, self.base, public, manifest)
+        self.assertEqual(
+            (public / "blog" / "post.html").read_text(),
+            "<html>Post|<article><div><h1>Post</h1></div></article></html>",
+        )
+
+        (public / "index.html").write_text("untouched")
+        self.section.write_text('{{ extends "../../template.html" }}\n{{ Content }}!')
+        generate_pages_recursively(self.content, self.base, public, manifest)
+        self.assertEqual((public / "index.html").read_text(), "untouched")
+        self.assertTrue(
+            (public / "blog" / "other.html").read_text().endswith("!</html>")
+        )
+        self.assertFalse((public / "_template.html").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -34,6 +34,11 @@ class TestTextNode(unittest.TestCase):
         node2 = TextNode("This is a text node", TextType.BOLD, "https://google.com")
         self.assertNotEqual(node, node2)
 
+    def test_has_no_instance_dict(self):
+        node = TextNode("This is a text node", TextType.BOLD)
+        self.assertFalse(hasattr(node, "__dict__"))
+        self.assertRaises(AttributeError, lambda: setattr(node, "extra", 1))
+
 
 if __name__ == "__main__":
     unittest.main()
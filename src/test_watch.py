@@ -0,0 +1,95 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from document import generate_pages_recursively
+from manifest import Manifest
+from watch import SiteRebuilder, Watcher
+
+
+class TestWatcher(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        (self.root / "a.md").write_text("a")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_reports_added_modified_and_removed_files(self):
+        watcher = Watcher([self.root])
+        a = self.root / "a.md"
+        os.utime(a, ns=(0, a.stat().st_mtime_ns + 10**9))
+        (self.root / "b.md").write_text("b")
+        self.assertEqual(watcher.poll(), {a, self.root / "b.md"})
+        a.unlink()
+        self.assertEqual(watcher.poll(), {a})
+        self.assertEqual(watcher.poll(), set())
+
+
+class TestSiteRebuilder(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        self.content = root / "content"
+        self.static = root / "static"
+        self.public = root / "public"
+        self.template = root / "template.html"
+        for path in (self.content / "blog", self.static, self.public):
+            path.mkdir(parents=True)
+        self.template.write_text("{{ Title }}|{{ Content }}")
+        (self.content / "index.md").write_text("# Home")
+        (self.content / "blog" / "post.md").write_text("# Post")
+        manifest = Manifest(root / "manifest.json")
+        generate_pages_recursively(self.content, self.template, self.public, manifest)
+        self.rebuilder = SiteRebuilder(
+            self.content, self.static, self.template, self.public, manifest
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_rebuilds_only_changed_page(self):
+        post = self.content / "blog" / "post.md"
+        post.write_text("# Edited")
+        self.assertEqual(self.rebuilder.rebuild({post}), 1)
+        self.assertEqual(
+            (self.public / "blog" / "post.html").read_text(),
+            "Edited|<div><h1>Edited</h1></div>",
+        )
+
+    def test_rebuilds_every_page_when_template_changes(self):
+        self.template.write_text("<b>{{ Title }}</b>")
+        self.assertEqual(self.rebuilder.rebuild({self.template}), 2)
+        self.assertEqual((self.public / "index.html").read_text(), "<b>Home</b>")
+
+    def test_section_layout_rebuilds_only_pages_below_it(self):
+        layout = self.content / "blog" / "_template.html"
+        layout.write_text("<i>{{ Title }}</i>")
+        self.assertEqual(self.rebuilder.rebuild({layout}), 1)
+        self.assertEqual(
+            (self.public / "blog" / "post.html").read_text(), "<i>Post</i>"
+        )
+
+        layout.write_text("<b>{{ Title }}</b>")
+        self.assertEqual(self.rebuilder.rebuild({layout}), 1)
+        self.assertEqual(
+            (self.public / "blog" / "post.html").read_text(), "<b>Post</b>"
+        )
+
+    def test_removes_output_of_deleted_page(self):
+        post = self.content / "blog" / "post.md"
+        post.unlink()
+        self.rebuilder.rebuild({post})
+        self.assertFalse((self.public / "blog" / "post.html").exists())
+
+    def test_copies_changed_asset(self):
+        css = self.static / "index.css"
+        css.write_text("body {}")
+        self.rebuilder.rebuild({css})
+        self.assertEqual((self.public / "index.css").read_text(), "body {}")
+
+
+if __name__ == "__main__":
+    unittest.main()
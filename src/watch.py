@@ -0,0 +1,233 @@
+import functools
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+import os
+from pathlib import Path
+import threading
+import time
+from typing import Dict, List, Set
+
+from document import PageJob
+from manifest import Manifest
+from minify import AssetMinifier
+from sync import fast_copy
+from template import TemplateLoader, is_template_file
+
+RELOAD_PATH = "/__reload"
+RELOAD_SCRIPT = (
+    f'<script>new EventSource("{RELOAD_PATH}").onmessage = '
+    "() => location.reload()</script>"
+).encode()
+
+
+def snapshot(paths: List[Path]) -> Dict[Path, int]:
+    mtimes = {}
+    for path in paths:
+        if path.is_file():
+            mtimes[path] = path.stat().st_mtime_ns
+            continue
+        for dirpath, _, filenames in os.walk(path):
+            for filename in filenames:
+                file = Path(dirpath) / filename
+                try:
+                    mtimes[file] = file.stat().st_mtime_ns
+                except FileNotFoundError:
+                    pass
+    return mtimes
+
+
+class Watcher:
+    def __init__(self, paths: List[Path]) -> None:
+        self.paths = paths
+        self.mtimes = snapshot(paths)
+
+    def poll(self) -> Set[Path]:
+        mtimes = snapshot(self.paths)
+        changed = {
+            path
+            for path in mtimes.keys() | self.mtimes.keys()
+            if mtimes.get(path) != self.mtimes.get(path)
+        }
+        self.mtimes = mtimes
+        return changed
+
+
+class SiteRebuilder:
+    def __init__(
+        self,
+        content: Path,
+        static: Path,
+        template_path: Path,
+        public: Path,
+        manifest: Manifest,
+        minifier: AssetMinifier | None = None,
+    ) -> None:
+        self.content = content
+        self.static = static
+        self.template_path = template_path
+        self.public = public
+        self.manifest = manifest
+        self.minifier = minifier
+        self.templates = self.load_templates()
+
+    def load_templates(self) -> TemplateLoader:
+        # Registering every page fills in the page -> layout dependency graph
+        templates = TemplateLoader(self.template_path, self.content)
+        for page in self.all_pages():
+            try:
+                templates.for_page(page)
+            except Exception as e:
+                print(f"Could not load template for {page}. Error:\n  {e}")
+        return templates
+
+    def page_job(self, source: Path) -> PageJob:
+        relative = source.relative_to(self.content)
+        dest = self.public / relative.parent / (relative.stem + ".html")
+        return PageJob(source, self.templates.for_page(source), dest)
+
+    def all_pages(self) -> List[Path]:
+        return sorted(self.content.rglob("*.md"))
+
+    def rebuild(self, changed: Set[Path]) -> int:
+        pages = set()
+        changed_templates = [
+            path
+            for path in changed
+            if path == self.template_path
+            or (path.is_relative_to(self.content) and is_template_file(path))
+        ]
+        if changed_templates:
+            for path in changed_templates:
+                pages.update(self.templates.pages_using(path))
+                if path.is_relative_to(self.content):
+                    # A layout that was just added or removed changes the pages
+                    # below it, which the old graph knows nothing about
+                    pages.update(path.parent.rglob("*.md"))
+            self.templates = self.load_templates()
+            pages = {page for page in pages if page.exists()}
+
+        for path in changed:
+            if path.is_relative_to(self.static):
+                self.sync_asset(path)
+            elif path.is_relative_to(self.content) and path.suffix == ".md":
+                if path.exists():
+                    pages.add(path)
+                else:
+                    self.manifest.forget(path)
+
+        for source in sorted(pages):
+            job = self.page_job(source)
+            job.dest_path.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                job.generate(self.manifest)
+            except Exception as e:
+                print(f"Could not generate {source}. Error:\n  {e}")
+            else:
+                print(f"Generated {job.dest_path}")
+        return len(pages)
+
+    def sync_asset(self, path: Path) -> None:
+        key = str(path.relative_to(self.static))
+        dest = self.public / key
+        if path.exists():
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            if self.minifier is not None and self.minifier.handles(path):
+                self.minifier.copy(path, dest)
+            else:
+                fast_copy(path, dest)
+            self.manifest.assets[key] = ""
+        else:
+            self.manifest.assets.pop(key, None)
+            dest.unlink(missing_ok=True)
+
+
+class ReloadHandler(SimpleHTTPRequestHandler):
+    server: "DevServer"
+
+    def do_GET(self) -> None:
+        if self.path == RELOAD_PATH:
+            self.send_events()
+            return
+
+        path = Path(self.translate_path(self.path))
+        if path.is_dir() and self.path.endswith("/"):
+            path = path / "index.html"
+        if path.suffix == ".html" and path.is_file():
+            self.send_page(path)
+            return
+        super().do_GET()
+
+    def send_page(self, path: Path) -> None:
+        page = path.read_bytes()
+        if b"</body>" in page:
+            page = page.replace(b"</body>", RELOAD_SCRIPT + b"</body>", 1)
+        else:
+            page += RELOAD_SCRIPT
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(page)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(page)
+
+    def send_events(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        generation = self.server.generation
+        try:
+            while True:
+                generation, reloaded = self.server.wait_for_reload(generation, 15)
+                self.wfile.write(b"data: reload\n\n" if reloaded else b": ping\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+class DevServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, directory: Path) -> None:
+        handler = functools.partial(ReloadHandler, directory=str(directory))
+        super().__init__(address, handler)
+        self.generation = 0
+        self.changed = threading.Condition()
+
+    def notify_reload(self) -> None:
+        with self.changed:
+            self.generation += 1
+            self.changed.notify_all()
+
+    def wait_for_reload(self, generation: int, timeout: float):
+        with self.changed:
+            self.changed.wait_for(lambda: self.generation != generation, timeout)
+            return self.generation, self.generation != generation
+
+
+def watch_site(
+    rebuilder: SiteRebuilder, port: int = 8888, interval: float = 0.05
+) -> None:
+    watcher = Watcher([rebuilder.content, rebuilder.static, rebuilder.template_path])
+    server = DevServer(("", port), rebuilder.public)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Serving {rebuilder.public} on http://localhost:{port}, watching...")
+
+    try:
+        while True:
+            time.sleep(interval)
+            changed = watcher.poll()
+            if not changed:
+                continue
+            start = time.perf_counter()
+            pages = rebuilder.rebuild(changed)
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"Rebuilt {pages} pages, {len(changed)} changes in {elapsed:.1f} ms")
+            server.notify_reload()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        rebuilder.manifest.save()